@@ -0,0 +1,332 @@
+"""
+Micro-benchmarks the authentication dependency chain: every stage of
+TokenBearer, AccessTokenBearer, get_current_user and RoleChecker on its own,
+the stages combined, and the chain resolved by FastAPI for a route. Redis and
+Postgres are replaced by in-process fakes, so only the code of the chain is
+measured.
+
+Reports ns/op and, from tracemalloc, the peak bytes allocated during one op and
+the bytes still held after it, as JSON. Every stage builds a new Request, like
+a real request does; the request stage measures just that, to subtract.
+
+Usage: python -m benchmarks.auth_chain [--iterations 20000] [--repeat 5]
+       [--stages access_token_bearer,chain] [--output auth.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import jwt
+from fastapi import Depends, FastAPI
+from fastapi.requests import Request
+from fastapi.security import HTTPBearer
+
+from src.endpoints.auth.config import settings
+from src.endpoints.auth.dependencies import (
+    AccessTokenBearer,
+    RoleChecker,
+    TokenBearer,
+    get_current_user,
+)
+from src.endpoints.auth.utils import UserRoles, create_access_token, decode_token
+from src.redis import redis_cache, redis_jti
+from src.redis.redis_cache import user_key
+
+
+class FakePubSub:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def subscribe(self, *channels):
+        pass
+
+    async def listen(self):
+        await asyncio.Event().wait()  # no revocations are ever published
+        yield
+
+
+class FakeRedis:
+    """
+    The commands of redis_client the chain uses, on a dict.
+    """
+
+    def __init__(self):
+        self.data: Dict[str, str] = {}
+
+    async def get(self, name):
+        return self.data.get(name)
+
+    async def set(self, name, value, ex=None, nx=False):
+        if nx and name in self.data:
+            return None
+        self.data[name] = value
+        return True
+
+    async def delete(self, *names):
+        return sum(self.data.pop(name, None) is not None for name in names)
+
+    async def publish(self, channel, message):
+        return 0
+
+    def pubsub(self):
+        return FakePubSub()
+
+
+class FakeRow:
+    def __init__(self, mapping: dict):
+        self._mapping = mapping
+
+
+class FakeResult:
+    def __init__(self, row: Optional[FakeRow]):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+
+class FakeSession:
+    """
+    Answers every statement with the same user row.
+    """
+
+    def __init__(self, user: dict):
+        self.row = FakeRow(user)
+
+    async def exec(self, statement):
+        return FakeResult(self.row)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stages", help="comma separated, all by default")
+    parser.add_argument("--output", help="file to write the results to")
+    return parser.parse_args(argv)
+
+
+async def build_stages() -> Dict[str, Callable[[], Awaitable]]:
+    fake_redis = FakeRedis()
+    redis_cache.redis_client = fake_redis
+    redis_jti.redis_client = fake_redis
+
+    user = {
+        "uid": uuid.uuid4(),
+        "username": "bench",
+        "email": "bench@example.com",
+        "role": UserRoles.ADMIN.value,
+    }
+    session = FakeSession(user)
+    user_data = {
+        "email": user["email"],
+        "user_uid": str(user["uid"]),
+        "role": user["role"],
+    }
+    token = create_access_token(user_data)
+    token_data = decode_token(token)
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/bench",
+        "raw_path": b"/bench",
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    http_bearer = HTTPBearer()
+    token_bearer = TokenBearer()
+    access_token_bearer = AccessTokenBearer()
+    role_checker = RoleChecker(allowed_roles=[UserRoles.ADMIN.value])
+
+    # no dependency_overrides: FastAPI re-analyzes overridden dependencies on
+    # every request. get_session opens a session, which connects only once used,
+    # and the principal is cached, so the route never reaches the database.
+    app = FastAPI()
+
+    @app.get("/bench", dependencies=[Depends(role_checker)])
+    async def protected_route():
+        return None
+
+    @app.get("/baseline")
+    async def baseline_route():
+        return None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def request():
+        return Request(dict(scope))
+
+    async def http_bearer_stage():
+        return await http_bearer(Request(dict(scope)))
+
+    async def jwt_decode():
+        return jwt.decode(
+            token, key=settings.jwt_secret, algorithms=[settings.jwt_algorithm]
+        )
+
+    async def decode_token_cached():
+        return decode_token(token)
+
+    async def token_bearer_stage():
+        return await token_bearer(Request(dict(scope)))
+
+    async def blocklist_cached():
+        return await redis_jti.token_in_blocklist(token_data["jti"], token_data["exp"])
+
+    async def blocklist_redis():
+        redis_jti._not_revoked.discard(token_data["jti"])
+        return await redis_jti.token_in_blocklist(token_data["jti"], token_data["exp"])
+
+    async def access_token_bearer_stage():
+        return await access_token_bearer(Request(dict(scope)))
+
+    async def current_user_cached():
+        return await get_current_user(token_data, session)
+
+    async def current_user_uncached():
+        await fake_redis.delete(user_key(user_data["user_uid"]))
+        return await get_current_user(token_data, session)
+
+    # caches the principal in the fake redis, like the first request of a user
+    principal = await get_current_user(token_data, session)
+
+    async def role_checker_stage():
+        return await role_checker(principal)
+
+    async def chain():
+        details = await access_token_bearer(Request(dict(scope)))
+        return await role_checker(await get_current_user(details, session))
+
+    async def route():
+        await app(dict(scope), receive, send)
+
+    async def route_baseline():
+        await app(dict(scope, path="/baseline", raw_path=b"/baseline"), receive, send)
+
+    return {
+        "request": request,
+        "http_bearer": http_bearer_stage,
+        "jwt_decode": jwt_decode,
+        "decode_token_cached": decode_token_cached,
+        "token_bearer": token_bearer_stage,
+        "blocklist_cached": blocklist_cached,
+        "blocklist_redis": blocklist_redis,
+        "access_token_bearer": access_token_bearer_stage,
+        "current_user_cached": current_user_cached,
+        "current_user_uncached": current_user_uncached,
+        "role_checker": role_checker_stage,
+        "chain": chain,
+        "route_baseline": route_baseline,
+        "route": route,
+    }
+
+
+async def time_stage(stage: Callable[[], Awaitable], iterations: int) -> float:
+    start_time = time.perf_counter_ns()
+    for _ in range(iterations):
+        await stage()
+    return (time.perf_counter_ns() - start_time) / iterations
+
+
+async def trace_stage(stage: Callable[[], Awaitable], iterations: int) -> dict:
+    """
+    Returns the mean peak bytes allocated during one op and the mean bytes
+    still held after it.
+    """
+    tracemalloc.start()
+    try:
+        peaks = 0
+        start_memory, _ = tracemalloc.get_traced_memory()
+        for _ in range(iterations):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await stage()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks += peak - before
+        end_memory, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_bytes_per_op": round(peaks / iterations, 1),
+        "retained_bytes_per_op": round((end_memory - start_memory) / iterations, 1),
+    }
+
+
+async def benchmark_stage(
+    stage: Callable[[], Awaitable], iterations: int, repeat: int
+) -> dict:
+    await time_stage(stage, min(iterations, 1000))  # warm up caches
+    timings = [await time_stage(stage, iterations) for _ in range(repeat)]
+    result = {
+        "ns_per_op": round(statistics.median(timings), 1),
+        "ns_per_op_min": round(min(timings), 1),
+    }
+    result.update(await trace_stage(stage, min(iterations, 2000)))
+    return result
+
+
+async def run(args: argparse.Namespace) -> dict:
+    stages = await build_stages()
+    names: List[str] = (
+        [name.strip() for name in args.stages.split(",")]
+        if args.stages
+        else list(stages)
+    )
+    unknown = set(names) - set(stages)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in names:
+        results[name] = await benchmark_stage(
+            stages[name], args.iterations, args.repeat
+        )
+        print(
+            f"{name:>24}: {results[name]['ns_per_op']:>12,.0f} ns/op "
+            f"{results[name]['alloc_peak_bytes_per_op']:>10,.0f} B peak/op",
+            file=sys.stderr,
+        )
+
+    return {
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "repeat": args.repeat,
+        "stages": results,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Load-tests the hot endpoints with concurrent clients and reports latency
+percentiles, throughput and database queries per request as JSON.
+
+Seed the data first with python -m benchmarks.seed. By default the app runs
+in-process, driven through its ASGI interface; with --url the requests go over
+HTTP to a running server, which has to use the same database. Queries per
+request come from the http_request_db_queries metric on /metrics; with several
+workers set PROMETHEUS_MULTIPROC_DIR, otherwise they are sampled from whichever
+worker serves the scrape.
+
+Usage: python -m benchmarks.load [--url http://127.0.0.1:8000]
+       [--scenarios login,list_books,get_book,add_review,tag_book]
+       [--requests 1000] [--concurrency 16] [--warmup 50] [--output run.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import text
+
+from benchmarks.seed import BENCH_EMAIL_PATTERN, BENCH_PASSWORD, BENCH_TAG_PREFIX
+from src.db.main import engine
+
+API = "/api/v1"
+SAMPLE_BOOKS = 5000
+SORTS = ("-created_at", "created_at", "title", "-published_date")
+
+
+class Worker:
+    """
+    One concurrent client, logged in as one of the seeded users.
+    """
+
+    def __init__(self, email: str, user_uid: str, owned_books: List[str]):
+        self.email = email
+        self.user_uid = user_uid
+        self.owned_books = owned_books
+        self.headers: Dict[str, str] = {}
+        self.rng = random.Random(email)
+
+
+class Dataset:
+    def __init__(self, users: List[tuple], books: List[tuple], tags: int, counts: dict):
+        self.users = users  # (email, uid)
+        self.books = [str(uid) for uid, _ in books]
+        self.owned_books: Dict[str, List[str]] = {}
+        for uid, user_uid in books:
+            self.owned_books.setdefault(str(user_uid), []).append(str(uid))
+        self.tags = tags
+        self.counts = counts
+
+
+async def login(client: httpx.AsyncClient, worker: Worker, dataset: Dataset):
+    return await client.post(
+        f"{API}/auth/login", json={"email": worker.email, "password": BENCH_PASSWORD}
+    )
+
+
+async def list_books(client: httpx.AsyncClient, worker: Worker, dataset: Dataset):
+    return await client.get(
+        f"{API}/books/",
+        params={"limit": 20, "sort": worker.rng.choice(SORTS)},
+        headers=worker.headers,
+    )
+
+
+async def get_book(client: httpx.AsyncClient, worker: Worker, dataset: Dataset):
+    book_uid = worker.rng.choice(dataset.books)
+    return await client.get(f"{API}/books/{book_uid}", headers=worker.headers)
+
+
+async def add_review(client: httpx.AsyncClient, worker: Worker, dataset: Dataset):
+    book_uid = worker.rng.choice(dataset.books)
+    rating = worker.rng.randint(1, 5)
+    return await client.post(
+        f"{API}/reviews/book/{book_uid}",
+        json={"rating": rating, "review_text": f"Rated {rating} out of 5."},
+        headers=worker.headers,
+    )
+
+
+async def tag_book(client: httpx.AsyncClient, worker: Worker, dataset: Dataset):
+    book_uid = worker.rng.choice(worker.owned_books)
+    names = worker.rng.sample(range(dataset.tags), min(3, dataset.tags))
+    return await client.post(
+        f"{API}/tags/book/{book_uid}",
+        json={"tags": [{"name": f"{BENCH_TAG_PREFIX}{n}"} for n in names]},
+        headers=worker.headers,
+    )
+
+
+# name: (request, method and route template as labelled in the metrics)
+SCENARIOS: Dict[str, tuple] = {
+    "login": (login, "POST", f"{API}/auth/login"),
+    "list_books": (list_books, "GET", f"{API}/books/"),
+    "get_book": (get_book, "GET", f"{API}/books/{{book_id}}"),
+    "add_review": (add_review, "POST", f"{API}/reviews/book/{{book_uid}}"),
+    "tag_book": (tag_book, "POST", f"{API}/tags/book/{{book_id}}"),
+}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="base url of a running server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--output", help="file to write the results to")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+async def load_dataset() -> Dataset:
+    async with engine.connect() as connection:
+        users = (
+            await connection.execute(
+                text("SELECT email, uid FROM users WHERE email LIKE :emails"),
+                {"emails": BENCH_EMAIL_PATTERN},
+            )
+        ).all()
+        books = (
+            await connection.execute(
+                text(
+                    "SELECT b.uid, b.user_uid FROM books b JOIN users u "
+                    "ON u.uid = b.user_uid WHERE u.email LIKE :emails "
+                    "ORDER BY random() LIMIT :limit"
+                ),
+                {"emails": BENCH_EMAIL_PATTERN, "limit": SAMPLE_BOOKS},
+            )
+        ).all()
+        tags = (
+            await connection.execute(
+                text("SELECT count(*) FROM tags WHERE name LIKE :tags"),
+                {"tags": f"{BENCH_TAG_PREFIX}%"},
+            )
+        ).scalar_one()
+        counts = {
+            table: (
+                await connection.execute(text(f"SELECT count(*) FROM {table}"))
+            ).scalar_one()
+            for table in ("users", "books", "reviews", "tags", "booktaglink")
+        }
+    if not users or not books:
+        raise SystemExit("No benchmark data found, run python -m benchmarks.seed.")
+    return Dataset(users, books, tags, counts)
+
+
+async def scrape_db_queries(client: httpx.AsyncClient) -> Dict[tuple, List[float]]:
+    """
+    Returns the sum and count of http_request_db_queries by method and route.
+    """
+    response = await client.get("/metrics")
+    response.raise_for_status()
+    samples: Dict[tuple, List[float]] = {}
+    for family in text_string_to_metric_families(response.text):
+        if family.name != "http_request_db_queries":
+            continue
+        for sample in family.samples:
+            key = (sample.labels["method"], sample.labels["route"])
+            values = samples.setdefault(key, [0.0, 0.0])
+            if sample.name.endswith("_sum"):
+                values[0] += sample.value
+            elif sample.name.endswith("_count"):
+                values[1] += sample.value
+    return samples
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an ordered list.
+    """
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    request: Callable,
+    workers: List[Worker],
+    dataset: Dataset,
+    total: int,
+) -> dict:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    remaining = total
+
+    async def run_worker(worker: Worker):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start_time = time.perf_counter()
+            try:
+                response = await request(client, worker, dataset)
+                status = response.status_code
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            latencies.append(time.perf_counter() - start_time)
+            if not (isinstance(status, int) and status < 400):
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(run_worker(worker) for worker in workers))
+    duration = time.perf_counter() - start_time
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_seconds": round(duration, 4),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3),
+        },
+    }
+
+
+async def benchmark(args: argparse.Namespace, client: httpx.AsyncClient) -> dict:
+    dataset = await load_dataset()
+    workers = []
+    for n in range(args.concurrency):
+        email, user_uid = dataset.users[n % len(dataset.users)]
+        owned_books = dataset.owned_books.get(str(user_uid), [])
+        workers.append(Worker(email, str(user_uid), owned_books))
+    if "tag_book" in args.scenarios and not all(w.owned_books for w in workers):
+        raise SystemExit("tag_book needs seeded books owned by every client's user.")
+
+    async def log_in(worker: Worker):
+        response = await login(client, worker, dataset)
+        response.raise_for_status()
+        worker.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    await asyncio.gather(*(log_in(worker) for worker in workers))
+
+    results = {}
+    for name in args.scenarios:
+        request, method, route = SCENARIOS[name]
+        if args.warmup:
+            await run_scenario(client, request, workers, dataset, args.warmup)
+        before = (await scrape_db_queries(client)).get((method, route), [0.0, 0.0])
+        result = await run_scenario(client, request, workers, dataset, args.requests)
+        after = (await scrape_db_queries(client)).get((method, route), [0.0, 0.0])
+        counted = after[1] - before[1]
+        result["queries_per_request"] = (
+            round((after[0] - before[0]) / counted, 3) if counted else None
+        )
+        results[name] = result
+        print(
+            f"{name}: {result['throughput_rps']} req/s, "
+            f"p50 {result['latency_ms']['p50']} ms, "
+            f"p99 {result['latency_ms']['p99']} ms, "
+            f"{result['queries_per_request']} queries/req, "
+            f"{sum(result['errors'].values())} error(s)",
+            file=sys.stderr,
+        )
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "mode": "http" if args.url else "in-process",
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "requests_per_scenario": args.requests,
+        "warmup_per_scenario": args.warmup,
+        "dataset": dataset.counts,
+        "scenarios": results,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with AsyncExitStack() as stack:
+            if args.url:
+                client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60)
+            else:
+                from src import app
+
+                # starts and stops the app the way the server does
+                await stack.enter_async_context(app.router.lifespan_context(app))
+                client = httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=app),
+                    base_url="http://benchmark",
+                    timeout=60,
+                )
+            await stack.enter_async_context(client)
+            report = await benchmark(args, client)
+    finally:
+        await engine.dispose()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
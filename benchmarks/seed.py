@@ -0,0 +1,269 @@
+"""
+Replaces the benchmark data in the database and clears the response cache, so
+that every benchmark run starts from the same state. Seeded users are named
+bench<n>@example.com and share the password BENCH_PASSWORD; other data is left
+alone.
+
+Usage: python -m benchmarks.seed [--users 100] [--books 10000]
+       [--reviews-per-book 5] [--tags-per-book 3] [--tags 200]
+
+Run it where the app runs, e.g. docker compose run web python -m benchmarks.seed
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlalchemy import text
+
+from src.db.main import engine
+from src.endpoints.auth.utils import generate_passwd_hash
+from src.redis.main import redis_client
+
+BENCH_PASSWORD = "benchmark-password"
+BENCH_EMAIL_PATTERN = "bench%@example.com"
+BENCH_TAG_PREFIX = "bench-tag-"
+SEED_BATCH_SIZE = 5000  # books, with their reviews and tags, per transaction
+
+LANGUAGES = ("en", "de", "fr", "es", "it", "pt", "nl", "pl")
+WORDS = (
+    "river night garden silent stone winter house shadow letter city glass "
+    "iron summer road forest island empire queen machine ocean dream fire "
+    "secret mountain storm world history music love war light"
+).split()
+
+USER_COLUMNS = (
+    "uid",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "role",
+    "is_verified",
+    "password_hash",
+    "created_at",
+    "updated_at",
+)
+BOOK_COLUMNS = (
+    "uid",
+    "title",
+    "author",
+    "publisher",
+    "published_date",
+    "page_count",
+    "language",
+    "user_uid",
+    "created_at",
+    "updated_at",
+    "rating_count",
+    "rating_sum",
+    "rating_1_count",
+    "rating_2_count",
+    "rating_3_count",
+    "rating_4_count",
+    "rating_5_count",
+)
+REVIEW_COLUMNS = (
+    "uid",
+    "rating",
+    "review_text",
+    "book_uid",
+    "user_uid",
+    "created_at",
+    "updated_at",
+)
+
+# removes the data of earlier runs, children first; tag links go with their books
+RESET_STATEMENTS = (
+    "DELETE FROM reviews WHERE user_uid IN "
+    "(SELECT uid FROM users WHERE email LIKE :emails)",
+    "DELETE FROM books WHERE user_uid IN "
+    "(SELECT uid FROM users WHERE email LIKE :emails)",
+    "DELETE FROM tags WHERE name LIKE :tags",
+    "DELETE FROM users WHERE email LIKE :emails",
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--reviews-per-book", type=int, default=5)
+    parser.add_argument("--tags-per-book", type=int, default=3)
+    parser.add_argument("--tags", type=int, default=200, help="size of the tag pool")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+    if args.users < 1:
+        parser.error("--users has to be at least 1")
+    if args.tags_per_book > args.tags:
+        parser.error("--tags-per-book can't exceed --tags")
+    return args
+
+
+def _user_records(count: int, password_hash: str, now: datetime) -> List[tuple]:
+    return [
+        (
+            uuid.uuid4(),
+            f"bench{n}",
+            f"bench{n}@example.com",
+            "Bench",
+            f"User {n}",
+            "user",
+            True,
+            password_hash,
+            now,
+            now,
+        )
+        for n in range(count)
+    ]
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+
+
+async def _copy(connection, table: str, records: List[tuple], columns) -> None:
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        table, records=records, columns=columns
+    )
+
+
+async def _seed_books(
+    connection,
+    rng: random.Random,
+    first: int,
+    count: int,
+    user_uids: List[uuid.UUID],
+    tag_uids: List[uuid.UUID],
+    args: argparse.Namespace,
+    now: datetime,
+) -> int:
+    authors = max(1, args.books // 20)
+    books, reviews, links = [], [], []
+    for n in range(first, first + count):
+        book_uid = uuid.uuid4()
+        created_at = now - timedelta(seconds=n)
+        ratings = [rng.randint(1, 5) for _ in range(args.reviews_per_book)]
+        books.append(
+            (
+                book_uid,
+                _title(rng),
+                f"Author {rng.randrange(authors)}",
+                f"Publisher {rng.randrange(50)}",
+                date(1950, 1, 1) + timedelta(days=rng.randrange(27_000)),
+                rng.randint(50, 1200),
+                rng.choice(LANGUAGES),
+                user_uids[n % len(user_uids)],
+                created_at,
+                created_at,
+                len(ratings),
+                sum(ratings),
+                *(ratings.count(rating) for rating in range(1, 6)),
+            )
+        )
+        for rating in ratings:
+            reviews.append(
+                (
+                    uuid.uuid4(),
+                    rating,
+                    f"Rated {rating} out of 5.",
+                    book_uid,
+                    rng.choice(user_uids),
+                    created_at,
+                    created_at,
+                )
+            )
+        for tag_uid in rng.sample(tag_uids, args.tags_per_book):
+            links.append((book_uid, tag_uid))
+
+    await _copy(connection, "books", books, BOOK_COLUMNS)
+    await _copy(connection, "reviews", reviews, REVIEW_COLUMNS)
+    await _copy(connection, "booktaglink", links, ("book_id", "tag_id"))
+    return len(reviews)
+
+
+async def _clear_cache() -> int:
+    keys = [key async for key in redis_client.scan_iter(match="cache:*", count=1000)]
+    for start in range(0, len(keys), 1000):
+        await redis_client.delete(*keys[start : start + 1000])
+    return len(keys)
+
+
+async def seed(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    start_time = time.perf_counter()
+
+    async with engine.begin() as connection:
+        for statement in RESET_STATEMENTS:
+            await connection.execute(
+                text(statement),
+                {"emails": BENCH_EMAIL_PATTERN, "tags": f"{BENCH_TAG_PREFIX}%"},
+            )
+
+    # every user shares one hash; hashing each would take minutes
+    password_hash = generate_passwd_hash(BENCH_PASSWORD)
+    users = _user_records(args.users, password_hash, now)
+    async with engine.begin() as connection:
+        await _copy(connection, "users", users, USER_COLUMNS)
+        tag_uids = [uuid.uuid4() for _ in range(args.tags)]
+        await _copy(
+            connection,
+            "tags",
+            [(uid, f"{BENCH_TAG_PREFIX}{n}", now) for n, uid in enumerate(tag_uids)],
+            ("uid", "name", "created_at"),
+        )
+
+    user_uids = [user[0] for user in users]
+    reviews = 0
+    for first in range(0, args.books, SEED_BATCH_SIZE):
+        async with engine.begin() as connection:
+            reviews += await _seed_books(
+                connection,
+                rng,
+                first,
+                min(SEED_BATCH_SIZE, args.books - first),
+                user_uids,
+                tag_uids,
+                args,
+                now,
+            )
+
+    async with engine.begin() as connection:
+        for table in ("users", "books", "reviews", "tags", "booktaglink"):
+            await connection.execute(text(f"ANALYZE {table}"))
+
+    cleared = await _clear_cache()
+    return {
+        "users": args.users,
+        "books": args.books,
+        "reviews": reviews,
+        "tags": args.tags,
+        "tag_links": args.books * args.tags_per_book,
+        "cache_keys_cleared": cleared,
+        "seconds": round(time.perf_counter() - start_time, 3),
+    }
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    try:
+        summary = await seed(args)
+    finally:
+        await engine.dispose()
+        await redis_client.aclose()
+    print(
+        f"Seeded {summary['users']} user(s), {summary['books']} book(s), "
+        f"{summary['reviews']} review(s) and {summary['tag_links']} tag link(s) "
+        f"in {summary['seconds']} s; cleared {summary['cache_keys_cleared']} "
+        f"cached response(s)."
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
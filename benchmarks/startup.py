@@ -0,0 +1,236 @@
+"""
+Measures the cold start of a worker, each run in a fresh interpreter: importing
+the app, its lifespan startup, its first two requests and its shutdown. Also
+profiles the import of the app with python -X importtime, by package and by
+module, and reports both as JSON.
+
+Seed the data first with python -m benchmarks.seed; the requests list books as
+one of the seeded users. The first run isn't reported: it warms the OS file
+cache and the Redis cache, which a worker added to a running deployment finds
+warm as well.
+
+Usage: python -m benchmarks.startup [--repeat 5] [--top 20] [--output startup.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from benchmarks.seed import BENCH_EMAIL_PATTERN
+from src.db.main import engine
+from src.endpoints.auth.utils import create_access_token
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# runs in a fresh interpreter, with the token as its argument; nothing but time
+# is imported before the app, so that the import includes every module it needs
+CHILD = """
+import time
+
+start_time = time.perf_counter()
+import src
+
+imported_at = time.perf_counter()
+
+import asyncio
+import json
+import sys
+
+import httpx
+
+
+async def run():
+    timings = {"import": imported_at - start_time}
+    headers = {"Authorization": f"Bearer {sys.argv[1]}"}
+    before = time.perf_counter()
+    async with src.app.router.lifespan_context(src.app):
+        timings["startup"] = time.perf_counter() - before
+        transport = httpx.ASGITransport(app=src.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://startup", headers=headers
+        ) as client:
+            for name in ("first_request", "second_request"):
+                before = time.perf_counter()
+                response = await client.get("/api/v1/books/", params={"limit": 20})
+                response.raise_for_status()
+                timings[name] = time.perf_counter() - before
+        before = time.perf_counter()
+    timings["shutdown"] = time.perf_counter() - before
+    print(json.dumps(timings))
+
+
+asyncio.run(run())
+"""
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="modules to list")
+    parser.add_argument("--output", help="file to write the results to")
+    return parser.parse_args(argv)
+
+
+async def bench_token() -> str:
+    try:
+        async with engine.connect() as connection:
+            user = (
+                await connection.execute(
+                    text(
+                        "SELECT email, uid, role FROM users "
+                        "WHERE email LIKE :emails LIMIT 1"
+                    ),
+                    {"emails": BENCH_EMAIL_PATTERN},
+                )
+            ).first()
+    finally:
+        await engine.dispose()
+    if user is None:
+        raise SystemExit("No benchmark data found, run python -m benchmarks.seed.")
+    return create_access_token(
+        {"email": user.email, "user_uid": str(user.uid), "role": user.role}
+    )
+
+
+def _run(command: List[str]) -> subprocess.CompletedProcess:
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"{' '.join(command[:3])} failed:\n{result.stderr[-2000:]}")
+    return result
+
+
+def time_interpreter() -> float:
+    """
+    Returns the seconds a bare interpreter takes to start and exit.
+    """
+    before = time.perf_counter()
+    _run([sys.executable, "-c", "pass"])
+    return time.perf_counter() - before
+
+
+def time_cold_start(token: str) -> Dict[str, float]:
+    before = time.perf_counter()
+    result = _run([sys.executable, "-c", CHILD, token])
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - before
+    return timings
+
+
+def profile_imports() -> Dict[str, tuple]:
+    """
+    Returns the self and cumulative microseconds of every module imported by
+    the app, as reported by python -X importtime.
+    """
+    result = _run([sys.executable, "-X", "importtime", "-c", "import src"])
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def summarize(samples: List[float]) -> dict:
+    return {
+        "median": round(statistics.median(samples) * 1000, 3),
+        "min": round(min(samples) * 1000, 3),
+        "max": round(max(samples) * 1000, 3),
+    }
+
+
+def summarize_profiles(profiles: List[Dict[str, tuple]], top: int) -> dict:
+    """
+    Medians over the runs of the self time by top-level package and of the
+    self and cumulative time of the slowest modules, in ms.
+    """
+    packages: Dict[str, List[float]] = {}
+    modules: Dict[str, List[tuple]] = {}
+    for profile in profiles:
+        totals: Dict[str, float] = {}
+        for name, times in profile.items():
+            package = name.split(".")[0]
+            totals[package] = totals.get(package, 0) + times[0]
+            modules.setdefault(name, []).append(times)
+        for package, total in totals.items():
+            packages.setdefault(package, []).append(total)
+
+    def median_ms(values) -> float:
+        return round(statistics.median(values) / 1000, 3)
+
+    by_package = sorted(
+        ((name, median_ms(totals)) for name, totals in packages.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    by_module = sorted(
+        (
+            (
+                name,
+                median_ms([times[0] for times in samples]),
+                median_ms([times[1] for times in samples]),
+            )
+            for name, samples in modules.items()
+        ),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return {
+        "modules_imported": round(statistics.median(len(p) for p in profiles)),
+        "self_ms_by_package": dict(by_package[:top]),
+        "slowest_modules": [
+            {"module": name, "self_ms": self_ms, "cumulative_ms": cumulative_ms}
+            for name, self_ms, cumulative_ms in by_module[:top]
+        ],
+    }
+
+
+def benchmark(args: argparse.Namespace, token: str) -> dict:
+    time_interpreter()
+    time_cold_start(token)  # warms the file and Redis caches, not reported
+
+    interpreter = [time_interpreter() for _ in range(args.repeat)]
+    runs = []
+    for _ in range(args.repeat):
+        runs.append(time_cold_start(token))
+        print(
+            "import {import:.3f} s, startup {startup:.3f} s, first request "
+            "{first_request:.3f} s, process {process:.3f} s".format(**runs[-1]),
+            file=sys.stderr,
+        )
+    profiles = [profile_imports() for _ in range(args.repeat)]
+
+    phases = {"interpreter": summarize(interpreter)}
+    for phase in runs[0]:
+        phases[phase] = summarize([run[phase] for run in runs])
+    return {
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "phases_ms": phases,
+        "imports": summarize_profiles(profiles, args.top),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    token = asyncio.run(bench_token())
+    report = benchmark(args, token)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
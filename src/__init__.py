@@ -1,39 +1,19 @@
+import gc
 import sys
 
 sys.dont_write_bytecode = True  # this is to prevent python from generating caches
 
-# from contextlib import asynccontextmanager
-
-from fastapi import FastAPI
-
-from src.endpoints.auth.routes import auth_router
-from src.endpoints.books.routes import book_router
-from src.endpoints.reviews.routes import review_router
-from src.endpoints.tags.routes import tag_router
-from src.middleware.main import register_middleware
-
-# from src.db.main import init_db
-
-# @asynccontextmanager
-# async def life_span(app: FastAPI):
-#     print("Server has started.")
-#     await init_db()
-#     yield
-#     print("Server has been stopped.")
-
-
-VERSION = "v1"
-
-app = FastAPI(
-    title="Bookly",
-    description="A REST API for a book review web service.",
-    version=VERSION,
-    # lifespan=life_span,
-)
-
-register_middleware(app)
-
-app.include_router(auth_router, prefix=f"/api/{VERSION}/auth", tags=["auth"])
-app.include_router(book_router, prefix=f"/api/{VERSION}/books", tags=["books"])
-app.include_router(review_router, prefix=f"/api/{VERSION}/reviews", tags=["reviews"])
-app.include_router(tag_router, prefix=f"/api/{VERSION}/tags", tags=["tags"])
+# building the app creates over a hundred thousand objects that live as long as
+# the worker; collecting while they are created finds next to nothing, so the
+# collector is paused until the app is built
+_gc_enabled = gc.isenabled()
+gc.disable()
+try:
+    from src.main import app
+finally:
+    # moves everything created so far out of the collector's reach: later
+    # collections, and the one at exit, no longer traverse the app's modules,
+    # models and routes
+    gc.freeze()
+    if _gc_enabled:
+        gc.enable()
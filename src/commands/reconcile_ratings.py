@@ -0,0 +1,24 @@
+"""
+Recomputes the rating aggregates of every book from its reviews.
+
+Usage: python -m src.commands.reconcile_ratings
+"""
+
+import asyncio
+
+from src.db.main import async_session_maker, engine
+from src.endpoints.books.service import BookService
+from src.redis.redis_cache import invalidate_book
+
+
+async def main():
+    async with async_session_maker() as session:
+        corrected = await BookService().reconcile_ratings(session)
+    if corrected:
+        await invalidate_book(None)
+    await engine.dispose()
+    print(f"Corrected the rating aggregates of {corrected} book(s).")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
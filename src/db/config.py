@@ -1,3 +1,5 @@
+from typing import Literal, Optional, Tuple
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -7,6 +9,47 @@ class _Settings(BaseSettings):
     postgres_password: str = Field(..., alias="POSTGRES_PASSWORD")
     postgres_db: str = Field(..., alias="POSTGRES_DB")
 
+    db_echo: bool = Field(False, alias="DB_ECHO")
+    db_pool_size: int = Field(10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(30.0, alias="DB_POOL_TIMEOUT")  # seconds
+    db_pool_recycle: int = Field(30 * 60, alias="DB_POOL_RECYCLE")  # seconds
+    db_pool_pre_ping: bool = Field(True, alias="DB_POOL_PRE_PING")
+    db_command_timeout: Optional[float] = Field(None, alias="DB_COMMAND_TIMEOUT")
+    db_statement_cache_size: int = Field(500, alias="DB_STATEMENT_CACHE_SIZE")
+    # connections all worker processes together may open, e.g. the max_connections
+    # of postgres minus what other clients need; unset leaves the pool as it is
+    db_max_connections: Optional[int] = Field(None, alias="DB_MAX_CONNECTIONS")
+    web_concurrency: int = Field(1, alias="WEB_CONCURRENCY")  # worker processes
+    # connections opened and prepared at startup; unset means the pool size
+    db_warm_connections: Optional[int] = Field(None, alias="DB_WARM_CONNECTIONS")
+    # requests running one statement this many times get logged as possible N+1s
+    db_repeated_statement_threshold: int = Field(
+        5, alias="DB_REPEATED_STATEMENT_THRESHOLD"
+    )
+    # "raise" fails requests that exceed their query budget, use it in tests
+    db_query_budget_mode: Literal["warn", "raise"] = Field(
+        "warn", alias="DB_QUERY_BUDGET_MODE"
+    )
+
+    @property
+    def db_pool_limits(self) -> Tuple[int, int]:
+        """
+        The pool size and max overflow of one worker, shrunk if needed so that
+        all workers together stay within db_max_connections.
+        """
+        if self.db_max_connections is None:
+            return self.db_pool_size, self.db_max_overflow
+
+        per_worker = self.db_max_connections // max(self.web_concurrency, 1)
+        if per_worker < 1:
+            raise ValueError(
+                f"DB_MAX_CONNECTIONS={self.db_max_connections} does not allow one "
+                f"connection for each of {self.web_concurrency} workers."
+            )
+        pool_size = min(self.db_pool_size, per_worker)
+        return pool_size, min(self.db_max_overflow, per_worker - pool_size)
+
     @property
     def database_url(self) -> str:
         return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@db:5432/{self.postgres_db}"
@@ -0,0 +1,157 @@
+import collections
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.db.config import settings
+
+logger = logging.getLogger(__name__)
+
+DB_QUERIES = Counter(
+    "db_queries",
+    "Statements executed on the database.",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing one statement, including fetching its result.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+# a run of bound parameters, e.g. an expanded IN list: $1::UUID, $2::UUID
+PARAMETERS_PATTERN = re.compile(r"\$\d+(?:::\w+)?(?:\s*,\s*\$\d+(?:::\w+)?)*")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class QueryBudgetExceededException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class QueryStats:
+    """
+    Statements executed on behalf of one request.
+    """
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id
+        self.queries = 0
+        self.duration = 0.0  # seconds
+        self.statements = collections.Counter()
+        self.budget: Optional[int] = None  # set by the query_budget dependency
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Returns the statement shapes run at least threshold times, most run first.
+        """
+        shapes = collections.Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+        return [
+            (shape, count)
+            for shape, count in shapes.most_common()
+            if count >= threshold
+        ]
+
+
+# set by the request middleware; statements run outside a request aren't attributed
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normalizes a statement so that runs differing only in the number of bound
+    parameters, e.g. in an IN list, count as the same statement.
+    """
+    statement = WHITESPACE_PATTERN.sub(" ", statement).strip()
+    return PARAMETERS_PATTERN.sub("?", statement)
+
+
+def query_budget(max_queries: int):
+    """
+    Returns a dependency that limits the statements its route may run to
+    max_queries. Requests over the budget are logged, or fail with
+    QueryBudgetExceededException if DB_QUERY_BUDGET_MODE is "raise".
+    Statements run while streaming a response body aren't counted.
+    """
+
+    async def set_query_budget():
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return set_query_budget
+
+
+def check_query_stats(stats: QueryStats, route: str) -> None:
+    """
+    Logs the statements a request repeated and enforces its query budget.
+    """
+    repeated = stats.repeated_statements(settings.db_repeated_statement_threshold)
+    for shape, count in repeated:
+        logger.warning(
+            "Request %s to %s ran a statement %d times, possibly an N+1 query: %s",
+            stats.request_id,
+            route,
+            count,
+            shape,
+        )
+
+    if stats.budget is None or stats.queries <= stats.budget:
+        return
+    message = (
+        f"Request {stats.request_id} to {route} ran {stats.queries} statements, "
+        f"over its budget of {stats.budget}."
+    )
+    if settings.db_query_budget_mode == "raise":
+        raise QueryBudgetExceededException(message)
+    logger.warning(message)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Counts and times every statement executed by engine, process-wide and for
+    the request it runs in.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.statements[statement] += 1
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Request %s: %s", stats.request_id, statement)
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        _record_query(conn)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        # failed statements never reach after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_times"):
+            _record_query(conn)
+
+
+def _record_query(conn) -> None:
+    duration = time.perf_counter() - conn.info["query_start_times"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_DURATION.observe(duration)
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.duration += duration
@@ -1,16 +1,37 @@
-from sqlalchemy.ext.asyncio import AsyncEngine
-from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel, create_engine, text
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, text
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.db.config import settings
+from src.db.instrumentation import instrument_engine
+from src.db.pool import InstrumentedAsyncAdaptedQueuePool
 
-engine = AsyncEngine(
-    create_engine(
-        url=settings.database_url,
-        echo=True,
-    )
+logger = logging.getLogger(__name__)
+
+# matches no row; warm-up lookups use it to run statements without side effects
+WARM_UP_UID = "00000000-0000-0000-0000-000000000000"
+
+pool_size, max_overflow = settings.db_pool_limits
+
+engine = create_async_engine(
+    url=settings.database_url,
+    echo=settings.db_echo,
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    pool_size=pool_size,
+    max_overflow=max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args={
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+        "command_timeout": settings.db_command_timeout,
+    },
 )
+instrument_engine(engine)
 
 
 # async def init_db():
@@ -20,11 +41,50 @@ engine = AsyncEngine(
 #         await conn.run_sync(SQLModel.metadata.create_all)
 
 
+async_session_maker = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+
 async def get_session():
-    Session = sessionmaker(
-        bind=engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
-    async with Session() as session:
+    """
+    Yields the session of the current request. FastAPI caches dependencies per
+    request, so every Depends(get_session) in one dependency tree shares this
+    session and its single pooled connection. Don't use it with use_cache=False.
+    """
+    async with async_session_maker() as session:
         yield session
+
+
+async def warm_up_db(
+    warmers: Sequence[Callable[[AsyncSession], Awaitable]],
+    connections: Optional[int] = None,
+) -> None:
+    """
+    Opens that many pooled connections at once, DB_WARM_CONNECTIONS or the pool
+    size by default, and runs every warmer on each of them. The first requests
+    then find connections with their types introspected and their statements
+    compiled and prepared. Failures are logged; the pool recovers on demand.
+    """
+    if connections is None:
+        connections = settings.db_warm_connections or pool_size
+    connections = min(connections, pool_size)
+
+    async def warm_up_connection():
+        async with async_session_maker() as session:
+            for warm_up in warmers:
+                await warm_up(session)
+
+    results = await asyncio.gather(
+        *(warm_up_connection() for _ in range(connections)), return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.error(
+            "Could not warm up %d of %d database connections.",
+            len(errors),
+            connections,
+            exc_info=errors[0],
+        )
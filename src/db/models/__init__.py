@@ -1,4 +1,11 @@
+from sqlalchemy.orm import configure_mappers
+
 from .auth_models import User
 from .books_models import Book
 from .reviews_models import Review
 from .tags_models import BookTagLink, Tag
+
+# the models refer to each other by name; resolve their relationships in one
+# step, now that all of them are defined, rather than on whichever statement or
+# loader option happens to touch a model first
+configure_mappers()
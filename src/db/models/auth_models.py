@@ -3,13 +3,19 @@ from datetime import datetime
 from typing import List
 
 import sqlalchemy.dialects.postgresql as pg
-from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlmodel import Column, Field, Index, Relationship, SQLModel, text
 
 from src.db.models import books_models, reviews_models
 
 
 class User(SQLModel, table=True):  # type: ignore[call-arg]
     __tablename__ = "users"
+    # emails and usernames are unique regardless of case; look them up through
+    # func.lower() so that these indexes are used
+    __table_args__ = (
+        Index("ix_users_email_lower", text("lower(email)"), unique=True),
+        Index("ix_users_username_lower", text("lower(username)"), unique=True),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(
@@ -33,11 +39,11 @@ class User(SQLModel, table=True):  # type: ignore[call-arg]
 
     books: List["books_models.Book"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
     )
     reviews: List["reviews_models.Review"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
     )
 
     def __repr__(self):
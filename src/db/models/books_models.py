@@ -1,15 +1,42 @@
 import uuid
 from datetime import date, datetime
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 
 import sqlalchemy.dialects.postgresql as pg
-from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlalchemy import Computed
+from sqlalchemy.orm import deferred
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 
 from src.db.models import auth_models, reviews_models, tags_models
 
 
 class Book(SQLModel, table=True):  # type: ignore[call-arg]
     __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_created_at_uid", "created_at", "uid"),
+        # listing filters on equality, followed by the default sort order
+        Index("ix_books_author_created_at_uid", "author", "created_at", "uid"),
+        Index("ix_books_language_created_at_uid", "language", "created_at", "uid"),
+        Index("ix_books_publisher_created_at_uid", "publisher", "created_at", "uid"),
+        Index("ix_books_user_uid_created_at_uid", "user_uid", "created_at", "uid"),
+        # listing sort orders, also serving range filters on the same column
+        Index("ix_books_published_date_uid", "published_date", "uid"),
+        Index("ix_books_title_uid", "title", "uid"),
+        Index("ix_books_page_count_uid", "page_count", "uid"),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_books_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_books_author_trgm",
+            "author",
+            postgresql_using="gin",
+            postgresql_ops={"author": "gin_trgm_ops"},
+        ),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(
@@ -29,16 +56,72 @@ class Book(SQLModel, table=True):  # type: ignore[call-arg]
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
 
+    # review rating aggregates, kept up to date by ReviewService
+    rating_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_sum: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_1_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_2_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_3_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_4_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_5_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+
+    # full-text search document, generated by postgres; deferred so that it is
+    # never loaded along with the book, and not part of the pydantic fields
+    search_vector: ClassVar = deferred(
+        Column(
+            pg.TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('simple', title), 'A') || "
+                "setweight(to_tsvector('simple', author), 'B') || "
+                "setweight(to_tsvector('simple', publisher), 'C')",
+                persisted=True,
+            ),
+        )
+    )
+
     user: Optional["auth_models.User"] = Relationship(back_populates="books")
     reviews: List["reviews_models.Review"] = Relationship(
         back_populates="book",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
     )
     tags: List["tags_models.Tag"] = Relationship(
         link_model=tags_models.BookTagLink,
         back_populates="books",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
     )
 
+    @property
+    def rating_average(self) -> Optional[float]:
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @property
+    def rating_histogram(self) -> List[int]:
+        """
+        Number of reviews for every rating from 1 to 5.
+        """
+        return [
+            self.rating_1_count,
+            self.rating_2_count,
+            self.rating_3_count,
+            self.rating_4_count,
+            self.rating_5_count,
+        ]
+
     def __repr__(self):
         return f"<Book {self.title}>"
@@ -3,13 +3,14 @@ from datetime import datetime
 from typing import Optional
 
 import sqlalchemy.dialects.postgresql as pg
-from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 
 from src.db.models import auth_models, books_models
 
 
 class Review(SQLModel, table=True):  # type: ignore[call-arg]
     __tablename__ = "reviews"
+    __table_args__ = (Index("ix_reviews_created_at_uid", "created_at", "uid"),)
 
     uid: uuid.UUID = Field(
         sa_column=Column(
@@ -21,7 +22,9 @@ class Review(SQLModel, table=True):  # type: ignore[call-arg]
     )
     rating: int = Field(ge=1, le=5)
     review_text: str
-    book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="books.uid")
+    book_uid: Optional[uuid.UUID] = Field(
+        default=None, foreign_key="books.uid", ondelete="SET NULL"
+    )
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
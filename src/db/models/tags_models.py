@@ -3,18 +3,29 @@ from datetime import datetime
 from typing import List
 
 import sqlalchemy.dialects.postgresql as pg
-from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 
 from src.db.models import books_models
 
 
 class BookTagLink(SQLModel, table=True):
-    book_id: uuid.UUID = Field(default=None, foreign_key="books.uid", primary_key=True)
-    tag_id: uuid.UUID = Field(default=None, foreign_key="tags.uid", primary_key=True)
+    # the primary key leads with book_id; this one finds the books of a tag
+    __table_args__ = (Index("ix_booktaglink_tag_id_book_id", "tag_id", "book_id"),)
+
+    book_id: uuid.UUID = Field(
+        default=None, foreign_key="books.uid", primary_key=True, ondelete="CASCADE"
+    )
+    tag_id: uuid.UUID = Field(
+        default=None, foreign_key="tags.uid", primary_key=True, ondelete="CASCADE"
+    )
 
 
 class Tag(SQLModel, table=True):
     __tablename__ = "tags"
+    __table_args__ = (
+        Index("ix_tags_created_at_uid", "created_at", "uid"),
+        Index("ix_tags_name", "name", unique=True),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(
@@ -30,7 +41,7 @@ class Tag(SQLModel, table=True):
     books: List["books_models.Book"] = Relationship(
         link_model=BookTagLink,
         back_populates="tags",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
     )
 
     def __repr__(self) -> str:
@@ -0,0 +1,151 @@
+import base64
+import json
+import uuid
+from datetime import date
+from typing import Any, Optional, Tuple
+
+from sqlalchemy.types import TypeDecorator
+from sqlmodel import asc, desc, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursorException(Exception):
+    def __init__(self, message: str = "The pagination cursor is invalid."):
+        super().__init__(message)
+
+
+def encode_cursor(sort_key: str, value, uid: uuid.UUID) -> str:
+    """
+    Encodes the keyset position of a row in a listing sorted by sort_key into
+    an opaque, url-safe cursor.
+    """
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([sort_key, value, str(uid)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column) -> Tuple[Any, uuid.UUID]:
+    """
+    Decodes a cursor produced by encode_cursor for a listing sorted by
+    sort_column. Raises InvalidCursorException if the cursor was tampered with,
+    is malformed or belongs to a listing with another sort order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_key, value, uid = json.loads(raw)
+        if not isinstance(sort_key, str) or not isinstance(uid, str):
+            raise TypeError("The sort key and uid of a cursor are strings.")
+        python_type = _python_type(sort_column)
+        if issubclass(python_type, date):
+            value = python_type.fromisoformat(value)
+        uid = uuid.UUID(uid)
+    except (ValueError, TypeError, NotImplementedError) as exc:
+        raise InvalidCursorException() from exc
+    if sort_key != sort_column.key or not isinstance(value, python_type):
+        raise InvalidCursorException()
+    if isinstance(value, bool) and python_type is not bool:  # bool subclasses int
+        raise InvalidCursorException()
+    return value, uid
+
+
+def _python_type(column) -> type:
+    column_type = column.type
+    if isinstance(column_type, TypeDecorator):  # e.g. sqlmodel's AutoString
+        column_type = column_type.impl_instance
+    return column_type.python_type
+
+
+async def paginate(
+    statement,
+    model,
+    session: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    sort_column=None,
+    descending: bool = True,
+) -> dict:
+    """
+    Applies keyset pagination ordered by (sort_column, uid) to a select
+    statement over model; by default newest first. The keyset condition lets
+    postgres seek straight into a (sort_column, uid) index, so every page costs
+    the same no matter how deep it is. sort_column must not be nullable.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if sort_column is None:
+        sort_column = model.created_at
+
+    if cursor is not None:
+        value, uid = decode_cursor(cursor, sort_column)
+        keyset = tuple_(sort_column, model.uid)
+        statement = statement.where(
+            keyset < tuple_(value, uid) if descending else keyset > tuple_(value, uid)
+        )
+
+    order = desc if descending else asc
+    statement = statement.order_by(order(sort_column), order(model.uid)).limit(
+        limit + 1  # one extra row tells us whether there is a next page
+    )
+    result = await session.exec(statement)
+    items = result.all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(
+            sort_column.key, getattr(last, sort_column.key), last.uid
+        )
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def encode_offset_cursor(offset: int) -> str:
+    """
+    Encodes the position of the next page of a ranked listing.
+    """
+    raw = json.dumps([offset]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    """
+    Decodes a cursor produced by encode_offset_cursor. Raises
+    InvalidCursorException if the cursor was tampered with or is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (offset,) = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorException() from exc
+    if not isinstance(offset, int) or offset < 0:
+        raise InvalidCursorException()
+    return offset
+
+
+async def paginate_by_offset(
+    statement,
+    session: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> dict:
+    """
+    Paginates an already ordered select statement with an offset. Meant for
+    ranked listings, which postgres has to sort as a whole anyway, so seeking by
+    a keyset would not make later pages any cheaper.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = decode_offset_cursor(cursor) if cursor is not None else 0
+
+    result = await session.exec(statement.offset(offset).limit(limit + 1))
+    items = result.all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_offset_cursor(offset + limit)
+
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,80 @@
+import operator
+import uuid
+from typing import Any, Callable, Dict, Iterable, Optional, Type
+
+import orjson
+from pydantic import BaseModel
+
+
+def _default(value):
+    # asyncpg returns its own uuid.UUID subclass, which orjson does not handle
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError
+
+
+def dumps(value) -> bytes:
+    return orjson.dumps(value, default=_default)
+
+
+class Projection:
+    """
+    Selects only the columns a response schema needs and serializes the rows
+    straight to JSON, skipping the ORM objects and the validation of every row
+    through the schema. The schema stays the contract: a projection has to
+    provide exactly its fields, which is checked when the projection is made.
+    """
+
+    def __init__(
+        self,
+        schema: Type[BaseModel],
+        columns: Iterable,
+        computed: Optional[Dict[str, Callable[[Any], Any]]] = None,
+    ):
+        self.schema = schema
+        self.columns = tuple(columns)
+        self.computed = computed or {}
+        self.fields = tuple(
+            column.key for column in self.columns if column.key in schema.model_fields
+        )
+        self._get_fields = operator.itemgetter(
+            *(
+                index
+                for index, column in enumerate(self.columns)
+                if column.key in schema.model_fields
+            )
+        )
+
+        provided = set(self.fields) | set(self.computed)
+        if provided != set(schema.model_fields):
+            raise ValueError(
+                f"The projection of {schema.__name__} provides {sorted(provided)} "
+                f"instead of {sorted(schema.model_fields)}."
+            )
+
+    def to_dict(self, row) -> dict:
+        """
+        Turns a row selected with self.columns into a dict shaped like the schema;
+        computed fields are called with the row.
+        """
+        values = self._get_fields(row)
+        if len(self.fields) == 1:
+            values = (values,)
+        data = dict(zip(self.fields, values))
+        for field, compute in self.computed.items():
+            data[field] = compute(row)
+        return data
+
+    def dump(self, rows: Iterable) -> bytes:
+        return dumps([self.to_dict(row) for row in rows])
+
+    def dump_page(self, page: dict) -> bytes:
+        """
+        Serializes a page returned by paginate or paginate_by_offset.
+        """
+        return dumps(
+            {
+                "items": [self.to_dict(row) for row in page["items"]],
+                "next_cursor": page["next_cursor"],
+            }
+        )
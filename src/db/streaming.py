@@ -0,0 +1,61 @@
+from enum import Enum
+from typing import AsyncIterator, List
+
+from src.db.main import async_session_maker
+from src.db.projections import Projection, dumps
+
+STREAM_BATCH_SIZE = 1000  # rows fetched from the server-side cursor at a time
+
+
+class StreamFormat(str, Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+
+    @property
+    def media_type(self) -> str:
+        if self is StreamFormat.NDJSON:
+            return "application/x-ndjson"
+        return "application/json"
+
+
+async def stream_rows(
+    statement, batch_size: int = STREAM_BATCH_SIZE
+) -> AsyncIterator[List]:
+    """
+    Yields the rows selected by statement in batches, fetched from a
+    server-side cursor, so only one batch is held in memory at a time.
+    Runs in a session of its own: a streamed response outlives the request's
+    session, and the connection stays checked out until the stream ends.
+    """
+    async with async_session_maker() as session:
+        result = await session.stream(statement.execution_options(yield_per=batch_size))
+        async for batch in result.partitions():
+            yield batch
+
+
+async def encode_stream(
+    batches: AsyncIterator[List],
+    projection: Projection,
+    stream_format: StreamFormat,
+) -> AsyncIterator[bytes]:
+    """
+    Serializes batches of rows selected with projection, one chunk per batch,
+    as a JSON array or as newline delimited JSON.
+    """
+    if stream_format is StreamFormat.JSON:
+        separator, first, last = b",", b"[", b"]"
+    else:
+        separator, first, last = b"\n", b"", b"\n"
+
+    started = False
+    async for batch in batches:
+        if not batch:
+            continue
+        chunk = separator.join(dumps(projection.to_dict(row)) for row in batch)
+        yield (separator if started else first) + chunk
+        started = True
+
+    if stream_format is StreamFormat.JSON:
+        yield last if started else first + last
+    elif started:
+        yield last
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -6,5 +8,11 @@ class _Settings(BaseSettings):
     jwt_secret: str = Field(..., alias="JWT_SECRET")
     jwt_algorithm: str = Field(..., alias="JWT_ALGORITHM")
 
+    bcrypt_rounds: int = Field(12, alias="BCRYPT_ROUNDS")
+    password_hash_executor: Literal["thread", "process"] = Field(
+        "thread", alias="PASSWORD_HASH_EXECUTOR"
+    )
+    password_hash_workers: int = Field(4, alias="PASSWORD_HASH_WORKERS")
+
 
 settings = _Settings()
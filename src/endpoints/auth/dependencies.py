@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import Depends, Request, status
 from fastapi.exceptions import HTTPException
@@ -6,10 +6,15 @@ from fastapi.security import HTTPBearer
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.db.main import get_session
-from src.db.models import User
-from src.endpoints.auth.service import UserNotFoundException, UserService
-from src.endpoints.auth.utils import decode_token
+from src.endpoints.auth.service import (
+    UserNotFoundException,
+    UserService,
+    user_relations_options,
+)
+from src.endpoints.auth.utils import UserRoles, decode_token
+from src.redis.redis_cache import get_or_set, user_key
 from src.redis.redis_jti import token_in_blocklist
+from src.schemas.auth_schemas import UserPrincipal
 
 user_service = UserService()
 
@@ -21,8 +26,15 @@ class TokenBearer(HTTPBearer):
     async def __call__(self, request: Request):
         creds = await super().__call__(request)
 
+        # every bearer instance in a request's dependency tree decodes the
+        # same token, so the result is memoized on the request
         token = creds.credentials
-        token_data = decode_token(token)
+        memo = getattr(request.state, "decoded_token", None)
+        if memo is not None and memo[0] == token:
+            token_data = memo[1]
+        else:
+            token_data = decode_token(token)
+            request.state.decoded_token = (token, token_data)
         token_valid = token_data is not None
 
         if not token_valid:
@@ -50,7 +62,7 @@ class AccessTokenBearer(TokenBearer):
                 },
             )
 
-        if await token_in_blocklist(token_data["jti"]):
+        if await token_in_blocklist(token_data["jti"], token_data["exp"]):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail={
@@ -78,31 +90,71 @@ class RefreshTokenBearer(TokenBearer):
         return token_data
 
 
+user_not_found_exception = HTTPException(
+    status_code=status.HTTP_403_FORBIDDEN,
+    detail={
+        "error": "Missing or invalid user",
+        "resolution": (
+            "Please make sure your user is correct and up to date "
+            "or try to contact support"
+        ),
+    },
+)
+
+
 async def get_current_user(
     token_details: dict = Depends(AccessTokenBearer()),
     session: AsyncSession = Depends(get_session),
-):
+) -> UserPrincipal:
+    """
+    Gets the uid, username, email and role of the current user, cached by user_uid.
+    """
+    user_uid = token_details["user"]["user_uid"]
+
+    async def load_principal() -> str:
+        principal = await user_service.get_user_principal(user_uid, session)
+        return principal.model_dump_json()
+
     try:
-        user_email = token_details["user"]["email"]
-        return await user_service.get_user_by_email(user_email, session)
+        principal = await get_or_set(user_key(user_uid), load_principal)
+        return UserPrincipal.model_validate_json(principal)
     except UserNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={
-                "error": "Missing or invalid email",
-                "resolution": (
-                    "Please make sure your user email is correct and up to date "
-                    "or try to contact support"
-                ),
-            },
+        raise user_not_found_exception
+
+
+async def get_current_user_with_relations(
+    token_details: dict = Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Gets the full current user with the relations UserRelations serializes.
+    """
+    try:
+        user_uid = token_details["user"]["user_uid"]
+        return await user_service.get_user(
+            user_uid, session, options=user_relations_options
         )
+    except UserNotFoundException:
+        raise user_not_found_exception
+
+
+async def get_owner_scope(
+    token_details: dict = Depends(AccessTokenBearer()),
+) -> Optional[str]:
+    """
+    Gets the user_uid that writes to owned resources are restricted to, or None
+    if the current user is an admin and may write any of them.
+    """
+    if token_details["user"]["role"] == UserRoles.ADMIN.value:
+        return None
+    return token_details["user"]["user_uid"]
 
 
 class RoleChecker:
     def __init__(self, allowed_roles: List[str]):
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user: User = Depends(get_current_user)):
+    async def __call__(self, current_user: UserPrincipal = Depends(get_current_user)):
         if not current_user.role in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
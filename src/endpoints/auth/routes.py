@@ -3,16 +3,21 @@ from fastapi.exceptions import HTTPException
 from fastapi.responses import JSONResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.db.instrumentation import query_budget
 from src.db.main import get_session
 from src.endpoints.auth.dependencies import (
     AccessTokenBearer,
     RefreshTokenBearer,
-    get_current_user,
+    get_current_user_with_relations,
+)
+from src.endpoints.auth.service import (
+    UserAlreadyExistsException,
+    UserNotFoundException,
+    UserService,
 )
-from src.endpoints.auth.service import UserNotFoundException, UserService
 from src.endpoints.auth.utils import (
+    check_password,
     create_access_token_pair_from_user_data,
-    verify_password,
 )
 from src.redis.redis_jti import add_jti_to_blocklist
 from src.schemas.auth_relations_schemas import UserRelations
@@ -29,18 +34,14 @@ async def create_user_account(
     user_data: UserCreate,
     session: AsyncSession = Depends(get_session),
 ):
-    email = user_data.email
-    user_exists = await user_service.user_exists(email, session)
-
-    if user_exists:
+    try:
+        return await user_service.create_user(user_data, session)
+    except UserAlreadyExistsException as exc:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User with email already exists",
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(exc),
         )
 
-    new_user = await user_service.create_user(user_data, session)
-    return new_user
-
 
 @auth_router.post("/login")
 async def login_user(
@@ -51,20 +52,25 @@ async def login_user(
     password = login_data.password
 
     try:
-        user = await user_service.get_user_by_email(email, session)
+        user = await user_service.get_user_credentials(email, session)
     except UserNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid email or password.",
         )
 
-    password_valid = verify_password(password, user.password_hash)
+    password_valid, new_password_hash = await check_password(
+        password, user.password_hash
+    )
     if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid email or password.",
         )
 
+    if new_password_hash is not None:  # e.g. the bcrypt cost has changed
+        await user_service.update_password_hash(user.uid, new_password_hash, session)
+
     user_data = {
         "email": user.email,
         "user_uid": str(user.uid),
@@ -97,6 +103,10 @@ async def revoke_token(
     )
 
 
-@auth_router.get("/current_user", response_model=UserRelations)
-async def get_user(user=Depends(get_current_user)):
+@auth_router.get(
+    "/current_user",
+    response_model=UserRelations,
+    dependencies=[Depends(query_budget(3))],
+)
+async def get_user(user=Depends(get_current_user_with_relations)):
     return user
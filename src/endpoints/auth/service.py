@@ -1,9 +1,19 @@
-from sqlmodel import select
+from contextlib import suppress
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload
+from sqlmodel import func, select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.db.main import WARM_UP_UID
 from src.db.models import User
-from src.endpoints.auth.utils import UserRoles, generate_passwd_hash
-from src.schemas.auth_schemas import UserCreate
+from src.endpoints.auth.utils import UserRoles, hash_password
+from src.redis.redis_cache import invalidate_user
+from src.schemas.auth_schemas import UserCreate, UserPrincipal
+
+# relationships are never loaded implicitly (lazy="raise" on the models),
+# so these options have to match what the UserRelations schema serializes
+user_relations_options = (selectinload(User.books), selectinload(User.reviews))
 
 
 class UserException(Exception):
@@ -15,34 +25,113 @@ class UserNotFoundException(UserException):
         super().__init__(message)
 
 
+class UserAlreadyExistsException(UserException):
+    def __init__(
+        self, message: str = "An user with this email or username already exists."
+    ):
+        super().__init__(message)
+
+
 class UserService:
-    async def get_user_by_email(self, email: str, session: AsyncSession):
+    async def get_user_by_email(self, email: str, session: AsyncSession, options=()):
         """
-        Gets an user by email. Raises UserNotFoundException if no user is found.
+        Gets an user by email, ignoring case, eager loading the relationships in
+        options. Raises UserNotFoundException if no user is found.
         """
-        statement = select(User).where(User.email == email)
+        statement = (
+            select(User)
+            .options(*options)
+            .where(func.lower(User.email) == email.lower())
+        )
         result = await session.exec(statement)
         user = result.first()
         if user:
             return user
         raise UserNotFoundException(f"User with email {email} was not found.")
 
-    async def user_exists(self, email: str, session: AsyncSession):
-        try:
-            await self.get_user_by_email(email, session)
-            return True
-        except UserNotFoundException:
-            return False
+    async def get_user(self, user_uid: str, session: AsyncSession, options=()):
+        """
+        Gets an user by user_uid, eager loading the relationships in options.
+        Raises UserNotFoundException if no user is found.
+        """
+        statement = select(User).options(*options).where(User.uid == user_uid)
+        result = await session.exec(statement)
+        user = result.first()
+        if user:
+            return user
+        raise UserNotFoundException(f"User with id {user_uid} was not found.")
+
+    async def get_user_principal(self, user_uid: str, session: AsyncSession):
+        """
+        Gets only the identity columns of an user by user_uid.
+        Raises UserNotFoundException if no user is found.
+        """
+        statement = select(User.uid, User.username, User.email, User.role).where(
+            User.uid == user_uid
+        )
+        result = await session.exec(statement)
+        row = result.first()
+        if row:
+            return UserPrincipal.model_validate(row._mapping)
+        raise UserNotFoundException(f"User with id {user_uid} was not found.")
+
+    async def get_user_credentials(self, email: str, session: AsyncSession):
+        """
+        Gets only the columns login needs of an user by email, ignoring case.
+        Raises UserNotFoundException if no user is found.
+        """
+        statement = select(User.uid, User.email, User.role, User.password_hash).where(
+            func.lower(User.email) == email.lower()
+        )
+        result = await session.exec(statement)
+        row = result.first()
+        if row:
+            return row
+        raise UserNotFoundException(f"User with email {email} was not found.")
 
     async def create_user(self, user_data: UserCreate, session: AsyncSession):
+        """
+        Creates an user in a single statement. Raises UserAlreadyExistsException
+        if the email or the username is taken, regardless of case.
+        """
         user_data_dict = user_data.model_dump()
         user_data_dict.update(
             {
-                "password_hash": generate_passwd_hash(user_data_dict.pop("password")),
+                "password_hash": await hash_password(user_data_dict.pop("password")),
                 "role": UserRoles.USER.value,
+                "is_verified": False,
             }
         )
-        new_user = User(**user_data_dict)
-        session.add(new_user)
+        # the unique indexes decide, so concurrent signups can't both succeed
+        statement = (
+            insert(User).values(user_data_dict).on_conflict_do_nothing().returning(User)
+        )
+        result = await session.exec(statement)
+        new_user = result.scalars().first()
+        if new_user is None:
+            raise UserAlreadyExistsException()
         await session.commit()
         return new_user
+
+    async def update_password_hash(
+        self, user_uid: str, password_hash: str, session: AsyncSession
+    ):
+        statement = (
+            update(User)
+            .where(User.uid == user_uid)
+            .values(password_hash=password_hash)
+            .execution_options(synchronize_session=False)
+        )
+        await session.exec(statement)
+        await session.commit()
+        await invalidate_user(user_uid)
+
+    async def warm_up(self, session: AsyncSession) -> None:
+        """
+        Runs the statements of the user lookups every request makes, matching
+        no user, so that they are compiled and prepared before the first request.
+        """
+        with suppress(UserNotFoundException):
+            await self.get_user_principal(WARM_UP_UID, session)
+        with suppress(UserNotFoundException):
+            await self.get_user_credentials("warm-up@localhost", session)
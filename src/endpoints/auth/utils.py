@@ -1,15 +1,25 @@
+import asyncio
+import functools
+import hashlib
 import logging
+import time
 import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import Enum
+from typing import Optional, Tuple
 
 import jwt
-from passlib.context import CryptContext
+from prometheus_client import Gauge, Histogram
 
 from src.endpoints.auth.config import settings
+from src.lru import ExpiringLRU
 
 ACCESS_TOKEN_EXPIRY = 60 * 60  # 1 hour
 REFRESH_TOKEN_EXPIRY = 60 * 60 * 24 * 2  # 2 days
+DECODED_TOKEN_CACHE_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
 
 
 class UserRoles(Enum):
@@ -17,17 +27,132 @@ class UserRoles(Enum):
     USER = "user"
 
 
-passwd_context = CryptContext(
-    schemes=["bcrypt"],
-)
+@functools.lru_cache(maxsize=None)
+def get_passwd_context():
+    """
+    Returns the password hashing context. passlib is imported on first use, by
+    warm_up_password_hashing in the lifespan or by the first hash otherwise,
+    so that it isn't on the import path of every worker and script.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        bcrypt__rounds=settings.bcrypt_rounds,
+    )
 
 
 def generate_passwd_hash(password: str) -> str:
-    return passwd_context.hash(password)
+    return get_passwd_context().hash(password)
 
 
 def verify_password(password: str, hash_: str):
-    return passwd_context.verify(password, hash_)
+    return get_passwd_context().verify(password, hash_)
+
+
+def verify_and_update_password(password: str, hash_: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, if its hash uses outdated settings (e.g. another
+    bcrypt cost), also returns a new hash of it; otherwise the new hash is None.
+    """
+    return get_passwd_context().verify_and_update(password, hash_)
+
+
+PASSWORD_HASH_QUEUED = Gauge(
+    "password_hash_queued",
+    "Password hashes and checks waiting for a free slot of the hashing pool.",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_RUNNING = Gauge(
+    "password_hash_running",
+    "Password hashes and checks running in the hashing pool.",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time spent waiting for a free slot of the password hashing pool.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent on one password hash or check in the hashing pool.",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+# bcrypt takes ~100-300 ms per call, so it never runs on the event loop; the
+# semaphore keeps callers queued here instead of inside the executor
+_passwd_executor: Executor = (
+    ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+    if settings.password_hash_executor == "process"
+    else ThreadPoolExecutor(
+        max_workers=settings.password_hash_workers,
+        thread_name_prefix="passwd-hash",
+    )
+)
+_passwd_semaphore = asyncio.Semaphore(settings.password_hash_workers)
+
+
+async def _run_in_passwd_pool(func, *args):
+    PASSWORD_HASH_QUEUED.inc()
+    start_time = time.perf_counter()
+    try:
+        await _passwd_semaphore.acquire()
+    finally:
+        PASSWORD_HASH_QUEUED.dec()
+    PASSWORD_HASH_QUEUE_WAIT.observe(time.perf_counter() - start_time)
+
+    PASSWORD_HASH_RUNNING.inc()
+    start_time = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_passwd_executor, func, *args)
+    finally:
+        PASSWORD_HASH_RUNNING.dec()
+        PASSWORD_HASH_DURATION.observe(time.perf_counter() - start_time)
+        _passwd_semaphore.release()
+
+
+async def hash_password(password: str) -> str:
+    return await _run_in_passwd_pool(generate_passwd_hash, password)
+
+
+async def check_password(password: str, hash_: str) -> Tuple[bool, Optional[str]]:
+    """
+    Runs verify_and_update_password in the password hashing pool.
+    """
+    return await _run_in_passwd_pool(verify_and_update_password, password, hash_)
+
+
+def _load_passwd_backend() -> None:
+    get_passwd_context().handler("bcrypt").get_backend()
+
+
+async def warm_up_password_hashing() -> None:
+    """
+    Starts the workers of the password hashing pool and loads the bcrypt backend
+    in them, so that the first logins don't pay for either. Failures are logged;
+    the pool starts its workers and loads the backend on demand.
+    """
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(_passwd_executor, _load_passwd_backend)
+            for _ in range(settings.password_hash_workers)
+        ),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.error(
+            "Could not warm up %d of %d password hashing workers.",
+            len(errors),
+            settings.password_hash_workers,
+            exc_info=errors[0],
+        )
+
+
+def shutdown_password_hashing() -> None:
+    _passwd_executor.shutdown(wait=False, cancel_futures=True)
 
 
 def create_access_token(
@@ -51,7 +176,21 @@ def create_access_token(
     return token
 
 
+# verified claims by the sha256 of their token, until the token expires
+_decoded_tokens = ExpiringLRU(DECODED_TOKEN_CACHE_SIZE)
+
+
 def decode_token(token: str) -> dict:
+    """
+    Verifies and decodes a token, or returns None if it is invalid or expired.
+    Verified claims are cached until the token expires, so repeated tokens skip
+    the signature check. The returned dict is shared; don't mutate it.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = _decoded_tokens.get(key)
+    if token_data is not None:
+        return token_data
+
     try:
         token_data = jwt.decode(
             jwt=token,
@@ -61,6 +200,9 @@ def decode_token(token: str) -> dict:
             #     "verify_exp": True,  # this should be enabled by default
             # }
         )
+        # a token without exp never expires, and isn't cached
+        if "exp" in token_data:
+            _decoded_tokens.add(key, token_data["exp"], token_data)
         return token_data
     except (jwt.PyJWKError, jwt.ExpiredSignatureError) as e:
         logging.exception(
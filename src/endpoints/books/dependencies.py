@@ -1,26 +1,33 @@
-from fastapi import Depends, HTTPException, status
-from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import date
+from typing import Optional
 
-from src.db.main import get_session
-from src.endpoints.auth.dependencies import AccessTokenBearer
-from src.endpoints.auth.utils import UserRoles
-from src.endpoints.books.service import BookService
+from fastapi import Query
 
-book_service = BookService()
+from src.schemas.books_schemas import BookFilters
 
 
-async def owns_book_or_admin(
-    book_id: str,
-    session: AsyncSession = Depends(get_session),
-    token_details=Depends(AccessTokenBearer()),
-):
-    user_id = token_details["user"]["user_uid"]
-    user_role = token_details["user"]["role"]
-    if (
-        not user_role == UserRoles.ADMIN.value
-        and not await book_service.user_owns_book(user_id, book_id, session)
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not allowed to perform this action",
-        )
+def book_filters(
+    author: Optional[str] = None,
+    language: Optional[str] = None,
+    publisher: Optional[str] = None,
+    published_from: Optional[date] = None,
+    published_to: Optional[date] = None,
+    min_page_count: Optional[int] = Query(default=None, ge=0),
+    max_page_count: Optional[int] = Query(default=None, ge=0),
+    tag: Optional[str] = None,
+    min_rating: Optional[float] = Query(default=None, ge=1, le=5),
+) -> BookFilters:
+    """
+    Collects the filter query parameters of book listings.
+    """
+    return BookFilters(
+        author=author,
+        language=language,
+        publisher=publisher,
+        published_from=published_from,
+        published_to=published_to,
+        min_page_count=min_page_count,
+        max_page_count=max_page_count,
+        tag=tag,
+        min_rating=min_rating,
+    )
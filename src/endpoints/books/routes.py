@@ -1,46 +1,179 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, status
 from fastapi.exceptions import HTTPException
+from fastapi.responses import Response, StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.db.instrumentation import query_budget
 from src.db.main import get_session
-from src.endpoints.auth.dependencies import AccessTokenBearer
-from src.endpoints.books.dependencies import owns_book_or_admin
-from src.endpoints.books.service import BookNotFoundException, BookService
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorException
+from src.db.streaming import StreamFormat, encode_stream
+from src.endpoints.auth.dependencies import AccessTokenBearer, get_owner_scope
+from src.endpoints.books.dependencies import book_filters
+from src.endpoints.books.service import (
+    IMPORT_BATCH_SIZE,
+    MAX_IMPORT_BATCH_SIZE,
+    BookNotFoundException,
+    BookNotOwnedException,
+    BookService,
+    book_projection,
+    book_relations_options,
+)
+from src.endpoints.books.utils import iter_csv_rows, iter_lines, iter_ndjson_rows
+from src.redis.redis_cache import (
+    BOOK_LIST_VERSION_KEY,
+    book_key,
+    book_list_key,
+    get_or_set,
+)
 from src.schemas.book_relations_schemas import BookRelations
-from src.schemas.books_schemas import Book, BookCreate, BookUpdate
+from src.schemas.books_schemas import (
+    Book,
+    BookCreate,
+    BookFilters,
+    BookImportSummary,
+    BookSort,
+    BookUpdate,
+)
+from src.schemas.pagination_schemas import Page
 
 book_router = APIRouter()
 book_service = BookService()
 access_token_bearer = AccessTokenBearer()
 
 
-@book_router.get("/", response_model=List[Book])
+@book_router.get(
+    "/", response_model=Page[Book], dependencies=[Depends(query_budget(1))]
+)
 async def get_all_books(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    sort: BookSort = BookSort.NEWEST,
+    filters: BookFilters = Depends(book_filters),
     session: AsyncSession = Depends(get_session),
     token_details=Depends(access_token_bearer),
 ):
-    return await book_service.get_all_books(session)
+    async def load_books() -> bytes:
+        books = await book_service.get_all_books(session, cursor, limit, filters, sort)
+        return book_projection.dump_page(books)
+
+    try:
+        key = await book_list_key(
+            "all", cursor, limit, sort.value, filters.model_dump_json()
+        )
+        content = await get_or_set(key, load_books)
+        return Response(content=content, media_type="application/json")
+    except InvalidCursorException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        )
 
 
-@book_router.get("/user/{user_uid}", response_model=List[Book])
+@book_router.get(
+    "/user/{user_uid}",
+    response_model=List[Book],
+    dependencies=[Depends(query_budget(1))],
+)
 async def get_user_books(
     user_uid: str,
+    sort: BookSort = BookSort.NEWEST,
+    filters: BookFilters = Depends(book_filters),
+    session: AsyncSession = Depends(get_session),
+    token_details=Depends(access_token_bearer),
+):
+    async def load_user_books() -> bytes:
+        books = await book_service.get_user_books(user_uid, session, filters, sort)
+        return book_projection.dump(books)
+
+    key = await book_list_key("user", user_uid, sort.value, filters.model_dump_json())
+    content = await get_or_set(key, load_user_books)
+    return Response(content=content, media_type="application/json")
+
+
+@book_router.get("/export", response_class=StreamingResponse)
+async def export_books(
+    stream_format: StreamFormat = Query(default=StreamFormat.NDJSON, alias="format"),
+    sort: BookSort = BookSort.NEWEST,
+    filters: BookFilters = Depends(book_filters),
+    token_details=Depends(access_token_bearer),
+):
+    """
+    Streams every book matching the filters as NDJSON or as one JSON array.
+    """
+    batches = book_service.export_books(filters, sort)
+    return StreamingResponse(
+        encode_stream(batches, book_projection, stream_format),
+        media_type=stream_format.media_type,
+    )
+
+
+@book_router.get("/user/{user_uid}/export", response_class=StreamingResponse)
+async def export_user_books(
+    user_uid: str,
+    stream_format: StreamFormat = Query(default=StreamFormat.NDJSON, alias="format"),
+    sort: BookSort = BookSort.NEWEST,
+    filters: BookFilters = Depends(book_filters),
+    token_details=Depends(access_token_bearer),
+):
+    batches = book_service.export_books(filters, sort, user_uid=user_uid)
+    return StreamingResponse(
+        encode_stream(batches, book_projection, stream_format),
+        media_type=stream_format.media_type,
+    )
+
+
+@book_router.get(
+    "/search", response_model=Page[Book], dependencies=[Depends(query_budget(1))]
+)
+async def search_books(
+    q: str = Query(min_length=2, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     session: AsyncSession = Depends(get_session),
     token_details=Depends(access_token_bearer),
 ):
-    return await book_service.get_user_books(user_uid, session)
+    """
+    Searches books by title, author and publisher, best match first.
+    """
+
+    async def load_books() -> bytes:
+        books = await book_service.search_books(q, session, cursor, limit)
+        return book_projection.dump_page(books)
+
+    try:
+        key = await book_list_key("search", q, cursor, limit)
+        content = await get_or_set(key, load_books)
+        return Response(content=content, media_type="application/json")
+    except InvalidCursorException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        )
 
 
-@book_router.get("/{book_id}", response_model=BookRelations)
+@book_router.get(
+    "/{book_id}", response_model=BookRelations, dependencies=[Depends(query_budget(2))]
+)
 async def get_book(
     book_id: str,
     session: AsyncSession = Depends(get_session),
     token_details=Depends(access_token_bearer),
 ) -> dict:
+    async def load_book() -> str:
+        book = await book_service.get_book(
+            book_id, session, options=book_relations_options
+        )
+        return BookRelations.model_validate(
+            book, from_attributes=True
+        ).model_dump_json()
+
     try:
-        return await book_service.get_book(book_id, session)
+        content = await get_or_set(
+            book_key(book_id), load_book, version_key=BOOK_LIST_VERSION_KEY
+        )
+        return Response(content=content, media_type="application/json")
     except BookNotFoundException as exc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -58,32 +191,65 @@ async def create_book(
     return await book_service.create_book(book_data, user_id, session)
 
 
+@book_router.post("/import", response_model=BookImportSummary)
+async def import_books(
+    request: Request,
+    batch_size: int = Query(default=IMPORT_BATCH_SIZE, ge=1, le=MAX_IMPORT_BATCH_SIZE),
+    session: AsyncSession = Depends(get_session),
+    token_details=Depends(access_token_bearer),
+):
+    """
+    Imports books from a streamed NDJSON body, or CSV with a header row when the
+    Content-Type is text/csv. Every row has the fields of BookCreate.
+    """
+    lines = iter_lines(request.stream())
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        rows = iter_csv_rows(lines)
+    else:
+        rows = iter_ndjson_rows(lines)
+
+    user_id = token_details["user"]["user_uid"]
+    return await book_service.import_books(rows, user_id, session, batch_size)
+
+
 @book_router.patch("/{book_id}", response_model=Book)
 async def update_book(
     book_id: str,
     book_update_data: BookUpdate,
     session: AsyncSession = Depends(get_session),
-    _=Depends(owns_book_or_admin),
+    owner_uid: Optional[str] = Depends(get_owner_scope),
 ) -> dict:
     try:
-        return await book_service.update_book(book_id, book_update_data, session)
+        return await book_service.update_book(
+            book_id, book_update_data, session, owner_uid=owner_uid
+        )
     except BookNotFoundException as exc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(exc),
         )
+    except BookNotOwnedException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(exc),
+        )
 
 
 @book_router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book(
     book_id: str,
     session: AsyncSession = Depends(get_session),
-    _=Depends(owns_book_or_admin),
+    owner_uid: Optional[str] = Depends(get_owner_scope),
 ):
     try:
-        await book_service.delete_book(book_id, session)
+        await book_service.delete_book(book_id, session, owner_uid=owner_uid)
     except BookNotFoundException as exc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(exc),
         )
+    except BookNotOwnedException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(exc),
+        )
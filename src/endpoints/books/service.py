@@ -1,10 +1,118 @@
+import uuid
+from contextlib import suppress
 from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 
-from sqlmodel import desc, select
+from asyncpg.exceptions import DataError, IntegrityConstraintViolationError
+from pydantic import ValidationError
+from sqlalchemy.orm import selectinload
+from sqlmodel import asc, delete, desc, func, literal, or_, select, text, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.db.models import Book
-from src.schemas.books_schemas import BookCreate, BookUpdate
+from src.db.main import WARM_UP_UID
+from src.db.models import Book, BookTagLink, Tag
+from src.db.pagination import DEFAULT_PAGE_SIZE, paginate, paginate_by_offset
+from src.db.projections import Projection
+from src.db.streaming import stream_rows
+from src.endpoints.books.utils import ImportRow, build_prefix_tsquery
+from src.redis.redis_cache import invalidate_book
+from src.schemas import books_schemas
+from src.schemas.books_schemas import BookCreate, BookFilters, BookSort, BookUpdate
+
+IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_BATCH_SIZE = 10_000
+MAX_IMPORT_ERRORS = 1000  # failed rows beyond this are counted but not reported
+# errors caused by the rows of a batch; any other error, e.g. a lost connection,
+# aborts the import rather than being reported against every row
+IMPORT_ROW_ERRORS = (
+    DataError,
+    IntegrityConstraintViolationError,
+    # raised by asyncpg while encoding a value that doesn't fit its column type
+    ValueError,
+    OverflowError,
+)
+BOOK_IMPORT_COLUMNS = (
+    "uid",
+    "title",
+    "author",
+    "publisher",
+    "published_date",
+    "page_count",
+    "language",
+    "user_uid",
+    "created_at",
+    "updated_at",
+)
+
+SEARCH_CONFIG = "simple"  # has to match the config of Book.search_vector
+
+# the columns of the Book schema; listings select these instead of whole books
+book_projection = Projection(
+    books_schemas.Book,
+    columns=(
+        Book.uid,
+        Book.title,
+        Book.author,
+        Book.publisher,
+        Book.published_date,
+        Book.page_count,
+        Book.language,
+        Book.created_at,
+        Book.updated_at,
+        Book.rating_count,
+        Book.rating_sum,
+        Book.rating_1_count,
+        Book.rating_2_count,
+        Book.rating_3_count,
+        Book.rating_4_count,
+        Book.rating_5_count,
+    ),
+    computed={
+        # the model's properties only read columns, so they work on rows too
+        "rating_average": Book.rating_average.fget,
+        "rating_histogram": Book.rating_histogram.fget,
+    },
+)
+
+# relationships are never loaded implicitly (lazy="raise" on the models),
+# so these options have to match what the BookRelations schema serializes
+book_relations_options = (selectinload(Book.reviews),)
+
+
+# recomputes the rating aggregates of every book from its reviews
+RECONCILE_RATINGS_SQL = text(
+    """
+    UPDATE books
+    SET rating_count = s.rating_count,
+        rating_sum = s.rating_sum,
+        rating_1_count = s.rating_1_count,
+        rating_2_count = s.rating_2_count,
+        rating_3_count = s.rating_3_count,
+        rating_4_count = s.rating_4_count,
+        rating_5_count = s.rating_5_count
+    FROM (
+        SELECT b.uid,
+               count(r.uid) AS rating_count,
+               coalesce(sum(r.rating), 0) AS rating_sum,
+               count(*) FILTER (WHERE r.rating = 1) AS rating_1_count,
+               count(*) FILTER (WHERE r.rating = 2) AS rating_2_count,
+               count(*) FILTER (WHERE r.rating = 3) AS rating_3_count,
+               count(*) FILTER (WHERE r.rating = 4) AS rating_4_count,
+               count(*) FILTER (WHERE r.rating = 5) AS rating_5_count
+        FROM books b LEFT JOIN reviews r ON r.book_uid = b.uid
+        GROUP BY b.uid
+    ) s
+    WHERE books.uid = s.uid
+      AND (
+          books.rating_count, books.rating_sum, books.rating_1_count,
+          books.rating_2_count, books.rating_3_count, books.rating_4_count,
+          books.rating_5_count
+      ) IS DISTINCT FROM (
+          s.rating_count, s.rating_sum, s.rating_1_count, s.rating_2_count,
+          s.rating_3_count, s.rating_4_count, s.rating_5_count
+      )
+    """
+)
 
 
 class BookException(Exception):
@@ -16,42 +124,164 @@ class BookNotFoundException(BookException):
         super().__init__(message)
 
 
+class BookNotOwnedException(BookException):
+    def __init__(self, message: str = "You are not allowed to perform this action"):
+        super().__init__(message)
+
+
 class BookService:
-    async def get_all_books(self, session: AsyncSession):
-        statement = select(Book).order_by(desc(Book.created_at))
-        result = await session.exec(statement)
-        books = result.all()
-        return books
+    async def get_all_books(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        filters: Optional[BookFilters] = None,
+        sort: BookSort = BookSort.NEWEST,
+    ):
+        """
+        Gets a page of the books matching filters in the given sort order, as
+        rows of book_projection. Raises InvalidCursorException if the cursor is invalid.
+        """
+        sort_column, descending = self._sort_column(sort)
+        return await paginate(
+            self._filtered_books_statement(filters),
+            Book,
+            session,
+            cursor,
+            limit,
+            sort_column=sort_column,
+            descending=descending,
+        )
+
+    async def search_books(
+        self,
+        search: str,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ):
+        """
+        Gets a page of books matching search as rows of book_projection, best
+        match first. Books match when
+        their title, author or publisher has words starting with every word of
+        search, or when their title or author is similar to search, which
+        tolerates typos.
+        Every condition is served by a GIN index on books.
+        Raises InvalidCursorException if the cursor is invalid.
+        """
+        tsquery_text = build_prefix_tsquery(search)
+        if tsquery_text is None:
+            return {"items": [], "next_cursor": None}
 
-    async def get_user_books(self, user_uid: str, session: AsyncSession):
+        tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+        search_text = literal(search)
+        rank = func.ts_rank_cd(Book.search_vector, tsquery) + func.greatest(
+            func.word_similarity(search_text, Book.title),
+            func.word_similarity(search_text, Book.author),
+        )
+        statement = (
+            select(*book_projection.columns)
+            .where(
+                or_(
+                    Book.search_vector.op("@@")(tsquery),
+                    search_text.op("<%")(Book.title),
+                    search_text.op("<%")(Book.author),
+                )
+            )
+            .order_by(desc(rank), desc(Book.uid))
+        )
+        return await paginate_by_offset(statement, session, cursor, limit)
+
+    async def get_user_books(
+        self,
+        user_uid: str,
+        session: AsyncSession,
+        filters: Optional[BookFilters] = None,
+        sort: BookSort = BookSort.NEWEST,
+    ):
+        sort_column, descending = self._sort_column(sort)
+        order = desc if descending else asc
         statement = (
-            select(Book)
+            self._filtered_books_statement(filters)
             .where(Book.user_uid == user_uid)
-            .order_by(desc(Book.created_at))
+            .order_by(order(sort_column), order(Book.uid))
         )
         result = await session.exec(statement)
         user_books = result.all()
         return user_books
 
-    async def get_book(self, book_uid: str, session: AsyncSession):
+    def export_books(
+        self,
+        filters: Optional[BookFilters] = None,
+        sort: BookSort = BookSort.NEWEST,
+        user_uid: Optional[str] = None,
+    ) -> AsyncIterator[List]:
+        """
+        Streams every book matching filters, of user_uid if given, in batches of
+        book_projection rows.
+        """
+        sort_column, descending = self._sort_column(sort)
+        order = desc if descending else asc
+        statement = self._filtered_books_statement(filters).order_by(
+            order(sort_column), order(Book.uid)
+        )
+        if user_uid is not None:
+            statement = statement.where(Book.user_uid == user_uid)
+        return stream_rows(statement)
+
+    def _filtered_books_statement(self, filters: Optional[BookFilters]):
         """
-        Gets a book by book_uid. Raises BookNotFoundException if no book is found.
+        Builds a select of the book_projection columns of the books matching
+        filters. Every filter is applied by postgres, and booktaglink is only
+        joined when filtering by tag.
         """
-        statement = select(Book).where(Book.uid == book_uid)
+        statement = select(*book_projection.columns)
+        if filters is None:
+            return statement
+
+        if filters.author is not None:
+            statement = statement.where(Book.author == filters.author)
+        if filters.language is not None:
+            statement = statement.where(Book.language == filters.language)
+        if filters.publisher is not None:
+            statement = statement.where(Book.publisher == filters.publisher)
+        if filters.published_from is not None:
+            statement = statement.where(Book.published_date >= filters.published_from)
+        if filters.published_to is not None:
+            statement = statement.where(Book.published_date <= filters.published_to)
+        if filters.min_page_count is not None:
+            statement = statement.where(Book.page_count >= filters.min_page_count)
+        if filters.max_page_count is not None:
+            statement = statement.where(Book.page_count <= filters.max_page_count)
+        if filters.min_rating is not None:
+            # rating_sum / rating_count >= min_rating, without the division
+            statement = statement.where(
+                Book.rating_count > 0,
+                Book.rating_sum >= filters.min_rating * Book.rating_count,
+            )
+        if filters.tag is not None:
+            # tag names are unique, so the join never duplicates a book
+            tag_uid = select(Tag.uid).where(Tag.name == filters.tag).scalar_subquery()
+            statement = statement.join(
+                BookTagLink, BookTagLink.book_id == Book.uid
+            ).where(BookTagLink.tag_id == tag_uid)
+        return statement
+
+    def _sort_column(self, sort: BookSort):
+        return getattr(Book, sort.value.lstrip("-")), sort.value.startswith("-")
+
+    async def get_book(self, book_uid: str, session: AsyncSession, options=()):
+        """
+        Gets a book by book_uid, eager loading the relationships in options.
+        Raises BookNotFoundException if no book is found.
+        """
+        statement = select(Book).options(*options).where(Book.uid == book_uid)
         result = await session.exec(statement)
         book = result.first()
         if book:
             return book
         raise BookNotFoundException(f"Book with id {book_uid} was not found.")
 
-    async def user_owns_book(self, user_uid: str, book_uid: str, session: AsyncSession):
-        statement = select(Book).where(
-            (Book.uid == book_uid) & (Book.user_uid == user_uid)
-        )
-        result = await session.exec(statement)
-        user_book = result.first()
-        return user_book is not None
-
     async def create_book(
         self, book_data: BookCreate, user_uid: str, session: AsyncSession
     ):
@@ -69,28 +299,215 @@ class BookService:
 
         session.add(new_book)
         await session.commit()
+        await invalidate_book(new_book.uid)
         return new_book
 
     async def update_book(
-        self, book_uid: str, update_data: BookUpdate, session: AsyncSession
+        self,
+        book_uid: str,
+        update_data: BookUpdate,
+        session: AsyncSession,
+        owner_uid: Optional[str] = None,
+    ) -> dict:
+        """
+        Updates a book, of owner_uid if given, in a single statement and returns
+        it shaped like the Book schema. Raises BookNotFoundException if no book
+        is found and BookNotOwnedException if owner_uid doesn't own it.
+        """
+        statement = (
+            update(Book)
+            .where(Book.uid == book_uid)
+            .values(update_data.model_dump())
+            .returning(*book_projection.columns)
+            .execution_options(synchronize_session=False)
+        )
+        if owner_uid is not None:
+            statement = statement.where(Book.user_uid == owner_uid)
+        result = await session.exec(statement)
+        updated = result.first()
+        if updated is None:
+            await self._raise_not_found_or_not_owned(book_uid, session)
+
+        await session.commit()
+        await invalidate_book(book_uid)
+        return book_projection.to_dict(updated)
+
+    async def delete_book(
+        self,
+        book_uid: str,
+        session: AsyncSession,
+        owner_uid: Optional[str] = None,
     ):
         """
-        Finds a book by book_uid and updates it. Raises BookNotFoundException if no book is found.
+        Deletes a book, of owner_uid if given, in a single statement; its tag
+        links go with it and its reviews are kept without a book. Raises
+        BookNotFoundException if no book is found and BookNotOwnedException if
+        owner_uid doesn't own it.
+        """
+        statement = delete(Book).where(Book.uid == book_uid).returning(Book.uid)
+        if owner_uid is not None:
+            statement = statement.where(Book.user_uid == owner_uid)
+        result = await session.exec(statement)
+        if result.first() is None:
+            await self._raise_not_found_or_not_owned(book_uid, session)
+
+        await session.commit()
+        await invalidate_book(book_uid)
+
+    async def _raise_not_found_or_not_owned(self, book_uid: str, session: AsyncSession):
+        """
+        Explains why a conditional write to a book matched no row; only runs
+        when the write failed, so successful writes stay a single statement.
         """
-        book_to_update = await self.get_book(book_uid, session)
+        result = await session.exec(select(Book.uid).where(Book.uid == book_uid))
+        if result.first() is None:
+            raise BookNotFoundException(f"Book with id {book_uid} was not found.")
+        raise BookNotOwnedException()
+
+    async def import_books(
+        self,
+        rows: AsyncIterator[ImportRow],
+        user_uid: str,
+        session: AsyncSession,
+        batch_size: int = IMPORT_BATCH_SIZE,
+    ) -> dict:
+        """
+        Validates rows with the BookCreate schema and inserts them with COPY in
+        batches, committing after every batch. Invalid rows are reported in
+        the returned summary instead of aborting the import.
+        """
+        summary = {"inserted": 0, "failed": 0, "errors": []}
+        owner_uid = uuid.UUID(str(user_uid))
+        batch: List[Tuple[int, tuple]] = []
+
+        async for line_number, data, error in rows:
+            if error is None:
+                try:
+                    book_data = BookCreate.model_validate(data)
+                    now = datetime.now()
+                    record = (
+                        uuid.uuid4(),
+                        book_data.title,
+                        book_data.author,
+                        book_data.publisher,
+                        datetime.strptime(book_data.published_date, "%Y-%m-%d").date(),
+                        book_data.page_count,
+                        book_data.language,
+                        owner_uid,
+                        now,
+                        now,
+                    )
+                    batch.append((line_number, record))
+                except (ValidationError, ValueError) as exc:
+                    error = str(exc)
 
-        update_data_dict = update_data.model_dump()
-        for k, v in update_data_dict.items():
-            setattr(book_to_update, k, v)
+            if error is not None:
+                self._add_import_error(summary, line_number, error)
 
+            if len(batch) >= batch_size:
+                await self._copy_book_batch(batch, session, summary)
+                batch = []
+
+        if batch:
+            await self._copy_book_batch(batch, session, summary)
+
+        if summary["inserted"]:
+            await invalidate_book(None)
+        return summary
+
+    async def _copy_book_batch(
+        self,
+        batch: List[Tuple[int, tuple]],
+        session: AsyncSession,
+        summary: dict,
+    ) -> None:
+        try:
+            await self._copy_book_records([record for _, record in batch], session)
+            summary["inserted"] += len(batch)
+            return
+        except IMPORT_ROW_ERRORS as exc:
+            await session.rollback()
+            if len(batch) == 1:
+                self._add_import_error(summary, batch[0][0], str(exc))
+                return
+        except Exception:
+            await session.rollback()
+            raise
+
+        # the database rejected the batch; bisect it to find the offending rows
+        # and keep the rest
+        middle = len(batch) // 2
+        await self._copy_book_batch(batch[:middle], session, summary)
+        await self._copy_book_batch(batch[middle:], session, summary)
+
+    async def _copy_book_records(self, records: List[tuple], session: AsyncSession):
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            Book.__tablename__,
+            records=records,
+            columns=BOOK_IMPORT_COLUMNS,
+        )
         await session.commit()
-        return book_to_update
 
-    async def delete_book(self, book_uid: str, session: AsyncSession):
+    def _add_import_error(self, summary: dict, line_number: int, error: str) -> None:
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_IMPORT_ERRORS:
+            summary["errors"].append({"line": line_number, "error": error})
+
+    async def apply_rating_change(
+        self,
+        book_uid: str,
+        session: AsyncSession,
+        added: Optional[int] = None,
+        removed: Optional[int] = None,
+    ):
         """
-        Finds a book by book_uid and deletes it. Raises BookNotFoundException if no book is found.
+        Updates the rating aggregates of a book for an added and/or removed review
+        rating, in the caller's transaction. The update is a relative increment,
+        so concurrent reviews of the same book don't lose counts.
         """
-        book_to_delete = await self.get_book(book_uid, session)
-        await session.delete(book_to_delete)
+        columns = Book.__table__.c
+        deltas = {"rating_count": 0, "rating_sum": 0}
+        if added is not None:
+            deltas["rating_count"] += 1
+            deltas["rating_sum"] += added
+            deltas[f"rating_{added}_count"] = deltas.get(f"rating_{added}_count", 0) + 1
+        if removed is not None:
+            deltas["rating_count"] -= 1
+            deltas["rating_sum"] -= removed
+            deltas[f"rating_{removed}_count"] = (
+                deltas.get(f"rating_{removed}_count", 0) - 1
+            )
+
+        values = {
+            name: columns[name] + delta for name, delta in deltas.items() if delta
+        }
+        if not values:
+            return
+        statement = (
+            update(Book)
+            .where(Book.uid == book_uid)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.exec(statement)
+
+    async def reconcile_ratings(self, session: AsyncSession) -> int:
+        """
+        Recomputes the rating aggregates of every book from its reviews, fixing
+        any drift. Returns the number of books that had to be corrected.
+        """
+        result = await session.exec(RECONCILE_RATINGS_SQL)
         await session.commit()
-        return book_to_delete
+        return result.rowcount
+
+    async def warm_up(self, session: AsyncSession) -> None:
+        """
+        Runs the statements of the hot book routes, reading no more than the
+        first page, so that they are compiled and prepared before the first request.
+        """
+        await self.get_all_books(session)
+        await self.get_user_books(WARM_UP_UID, session)
+        with suppress(BookNotFoundException):
+            await self.get_book(WARM_UP_UID, session, options=book_relations_options)
@@ -0,0 +1,77 @@
+import codecs
+import csv
+import json
+import re
+from typing import AsyncIterator, Optional, Tuple
+
+ImportRow = Tuple[int, Optional[dict], Optional[str]]  # line, data, parse error
+
+SEARCH_TERM_PATTERN = re.compile(r"\w+")
+
+
+def build_prefix_tsquery(search: str) -> Optional[str]:
+    """
+    Turns free text into a to_tsquery expression matching documents with a word
+    starting with every word of the text. Returns None if the text has no words.
+    """
+    terms = SEARCH_TERM_PATTERN.findall(search.lower())
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Splits a stream of utf-8 encoded chunks into lines without buffering more
+    than one chunk and one partial line.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[ImportRow]:
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, data, None
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[ImportRow]:
+    """
+    Parses CSV with a header row. Every record has to fit on one line, quoted
+    fields spanning several lines are not supported.
+    """
+    header = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_number, None, (
+                f"Expected {len(header)} fields but got {len(values)}"
+            )
+            continue
+        yield line_number, dict(zip(header, values)), None
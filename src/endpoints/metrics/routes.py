@@ -0,0 +1,36 @@
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+
+prometheus_router = APIRouter()
+
+
+@prometheus_router.get("/metrics", include_in_schema=False)
+async def get_prometheus_metrics():
+    """
+    Exposes the metrics in the Prometheus text format. With several workers,
+    set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by them, so every
+    worker writes its samples there and any worker serves the aggregate.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def release_worker_metrics() -> None:
+    """
+    Drops the live gauges of this worker from the multiprocess samples; call it
+    when the worker shuts down.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,17 +1,27 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.db.instrumentation import query_budget
 from src.db.main import get_session
-from src.db.models import User
-from src.endpoints.auth.dependencies import AccessTokenBearer, get_current_user
-from src.endpoints.reviews.dependencies import owns_review_or_admin
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorException
+from src.db.streaming import StreamFormat, encode_stream
+from src.endpoints.auth.dependencies import (
+    AccessTokenBearer,
+    get_current_user,
+    get_owner_scope,
+)
 from src.endpoints.reviews.service import (
     ReviewException,
     ReviewNotFoundException,
+    ReviewNotOwnedException,
     ReviewService,
+    review_projection,
 )
+from src.schemas.auth_schemas import UserPrincipal
+from src.schemas.pagination_schemas import Page
 from src.schemas.reviews_schemas import Review, ReviewCreate, ReviewUpdate
 
 review_router = APIRouter()
@@ -19,24 +29,63 @@ review_service = ReviewService()
 access_token_bearer = AccessTokenBearer()
 
 
-@review_router.get("/", response_model=List[Review])
+@review_router.get(
+    "/", response_model=Page[Review], dependencies=[Depends(query_budget(1))]
+)
 async def get_all_reviews(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     session: AsyncSession = Depends(get_session),
     token_details=Depends(access_token_bearer),
 ):
-    return await review_service.get_all_reviews(session)
+    try:
+        reviews = await review_service.get_all_reviews(session, cursor, limit)
+        return Response(
+            content=review_projection.dump_page(reviews),
+            media_type="application/json",
+        )
+    except InvalidCursorException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        )
+
+
+@review_router.get("/export", response_class=StreamingResponse)
+async def export_reviews(
+    stream_format: StreamFormat = Query(default=StreamFormat.NDJSON, alias="format"),
+    token_details=Depends(access_token_bearer),
+):
+    """
+    Streams every review as NDJSON or as one JSON array.
+    """
+    batches = review_service.export_reviews()
+    return StreamingResponse(
+        encode_stream(batches, review_projection, stream_format),
+        media_type=stream_format.media_type,
+    )
 
 
-@review_router.get("/user/{user_uid}", response_model=List[Review])
+@review_router.get(
+    "/user/{user_uid}",
+    response_model=List[Review],
+    dependencies=[Depends(query_budget(1))],
+)
 async def get_user_reviews(
     user_uid: str,
     session: AsyncSession = Depends(get_session),
     token_details=Depends(access_token_bearer),
 ):
-    return await review_service.get_user_reviews(user_uid, session)
+    reviews = await review_service.get_user_reviews(user_uid, session)
+    return Response(
+        content=review_projection.dump(reviews),
+        media_type="application/json",
+    )
 
 
-@review_router.get("/{review_id}", response_model=Review)
+@review_router.get(
+    "/{review_id}", response_model=Review, dependencies=[Depends(query_budget(1))]
+)
 async def get_review(
     review_id: str,
     session: AsyncSession = Depends(get_session),
@@ -55,16 +104,17 @@ async def get_review(
     "/book/{book_uid}",
     status_code=status.HTTP_201_CREATED,
     response_model=Review,
+    dependencies=[Depends(query_budget(4))],
 )
 async def add_review_for_book(
     book_uid: str,
     review_data: ReviewCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     try:
         return await review_service.add_review_for_book(
-            user_email=current_user.email,
+            user_uid=current_user.uid,
             book_uid=book_uid,
             review_data=review_data,
             session=session,
@@ -81,29 +131,39 @@ async def update_review(
     review_id: str,
     review_update_data: ReviewUpdate,
     session: AsyncSession = Depends(get_session),
-    _=Depends(owns_review_or_admin),
+    owner_uid: Optional[str] = Depends(get_owner_scope),
 ) -> dict:
     try:
         return await review_service.update_review(
-            review_id, review_update_data, session
+            review_id, review_update_data, session, owner_uid=owner_uid
         )
     except ReviewNotFoundException as exc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(exc),
         )
+    except ReviewNotOwnedException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(exc),
+        )
 
 
 @review_router.delete("/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_review(
     review_id: str,
     session: AsyncSession = Depends(get_session),
-    _=Depends(owns_review_or_admin),
+    owner_uid: Optional[str] = Depends(get_owner_scope),
 ):
     try:
-        await review_service.delete_review(review_id, session)
+        await review_service.delete_review(review_id, session, owner_uid=owner_uid)
     except ReviewNotFoundException as exc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(exc),
         )
+    except ReviewNotOwnedException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(exc),
+        )
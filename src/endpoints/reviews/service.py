@@ -1,13 +1,34 @@
-from sqlmodel import desc, select
+from contextlib import suppress
+from typing import AsyncIterator, List, Optional
+
+from sqlmodel import delete, desc, select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.db.main import WARM_UP_UID
 from src.db.models import Review
-from src.endpoints.auth.service import UserException, UserService
+from src.db.pagination import DEFAULT_PAGE_SIZE, paginate
+from src.db.projections import Projection
+from src.db.streaming import stream_rows
 from src.endpoints.books.service import BookException, BookService
+from src.redis.redis_cache import invalidate_book
+from src.schemas import reviews_schemas
 from src.schemas.reviews_schemas import ReviewCreate, ReviewUpdate
 
 book_service = BookService()
-user_service = UserService()
+
+# the columns of the Review schema; listings select these instead of whole reviews
+review_projection = Projection(
+    reviews_schemas.Review,
+    columns=(
+        Review.uid,
+        Review.rating,
+        Review.review_text,
+        Review.book_uid,
+        Review.user_uid,
+        Review.created_at,
+        Review.updated_at,
+    ),
+)
 
 
 class ReviewException(Exception):
@@ -22,16 +43,37 @@ class ReviewNotFoundException(ReviewException):
         super().__init__(message)
 
 
+class ReviewNotOwnedException(ReviewException):
+    def __init__(self, message: str = "You are not allowed to perform this action"):
+        super().__init__(message)
+
+
 class ReviewService:
-    async def get_all_reviews(self, session: AsyncSession):
-        statement = select(Review).order_by(desc(Review.created_at))
-        result = await session.exec(statement)
-        reviews = result.all()
-        return reviews
+    async def get_all_reviews(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ):
+        """
+        Gets a page of reviews as rows of review_projection, newest first.
+        Raises InvalidCursorException if the cursor is invalid.
+        """
+        statement = select(*review_projection.columns)
+        return await paginate(statement, Review, session, cursor, limit)
+
+    def export_reviews(self) -> AsyncIterator[List]:
+        """
+        Streams every review, newest first, in batches of review_projection rows.
+        """
+        statement = select(*review_projection.columns).order_by(
+            desc(Review.created_at), desc(Review.uid)
+        )
+        return stream_rows(statement)
 
     async def get_user_reviews(self, user_uid: str, session: AsyncSession):
         statement = (
-            select(Review)
+            select(*review_projection.columns)
             .where(Review.user_uid == user_uid)
             .order_by(desc(Review.created_at))
         )
@@ -50,19 +92,9 @@ class ReviewService:
             return review
         raise ReviewNotFoundException(f"Review with id {review_uid} was not found.")
 
-    async def user_owns_review(
-        self, user_uid: str, review_uid: str, session: AsyncSession
-    ):
-        statement = select(Review).where(
-            (Review.uid == review_uid) & (Review.user_uid == user_uid)
-        )
-        result = await session.exec(statement)
-        user_review = result.first()
-        return user_review is not None
-
     async def add_review_for_book(
         self,
-        user_email: str,
+        user_uid: str,
         book_uid: str,
         review_data: ReviewCreate,
         session: AsyncSession,
@@ -72,48 +104,124 @@ class ReviewService:
         """
         try:
             book = await book_service.get_book(book_uid, session)
-            user = await user_service.get_user_by_email(user_email, session)
-        except (BookException, UserException) as exc:
+        except BookException as exc:
             raise ReviewException(
-                "Book or user couldn't be found. "
-                f"Book id: {book_uid}  -  User email: {user_email}"
+                f"Book with id {book_uid} couldn't be found."
             ) from exc
 
         review_data_dict = review_data.model_dump()
         review_data_dict.update(
             {
-                "user": user,
-                "book": book,
+                "user_uid": user_uid,
+                "book_uid": book.uid,
             }
         )
         new_review = Review(**review_data_dict)
 
         session.add(new_review)
+        await book_service.apply_rating_change(
+            book.uid, session, added=new_review.rating
+        )
         await session.commit()
+        await invalidate_book(book_uid)
         return new_review
 
     async def update_review(
-        self, review_uid: str, update_data: ReviewUpdate, session: AsyncSession
-    ):
+        self,
+        review_uid: str,
+        update_data: ReviewUpdate,
+        session: AsyncSession,
+        owner_uid: Optional[str] = None,
+    ) -> dict:
         """
-        Finds a review by review_uid and updates it.
-        Raises ReviewNotFoundException if no review is found.
+        Updates a review, of owner_uid if given, in a single statement that also
+        returns the previous rating, and returns it shaped like the Review schema.
+        Raises ReviewNotFoundException if no review is found and
+        ReviewNotOwnedException if owner_uid doesn't own it.
         """
-        review_to_update = await self.get_review(review_uid, session)
-
-        update_data_dict = update_data.model_dump()
-        for k, v in update_data_dict.items():
-            setattr(review_to_update, k, v)
-
+        previous = (
+            select(Review.uid, Review.rating)
+            .where(Review.uid == review_uid)
+            .with_for_update()
+            .subquery()
+        )
+        statement = (
+            update(Review)
+            .where(Review.uid == previous.c.uid)
+            .values(update_data.model_dump())
+            .returning(
+                *review_projection.columns,
+                previous.c.rating.label("previous_rating"),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if owner_uid is not None:
+            statement = statement.where(Review.user_uid == owner_uid)
+        result = await session.exec(statement)
+        updated = result.first()
+        if updated is None:
+            await self._raise_not_found_or_not_owned(review_uid, session)
+
+        review = review_projection.to_dict(updated)
+        if review["book_uid"] is not None:
+            await book_service.apply_rating_change(
+                review["book_uid"],
+                session,
+                added=review["rating"],
+                removed=updated.previous_rating,
+            )
         await session.commit()
-        return review_to_update
+        await invalidate_book(review["book_uid"])
+        return review
 
-    async def delete_review(self, review_uid: str, session: AsyncSession):
+    async def delete_review(
+        self,
+        review_uid: str,
+        session: AsyncSession,
+        owner_uid: Optional[str] = None,
+    ):
         """
-        Finds a review by review_uid and deletes it.
-        Raises ReviewNotFoundException if no review is found.
+        Deletes a review, of owner_uid if given, in a single statement.
+        Raises ReviewNotFoundException if no review is found and
+        ReviewNotOwnedException if owner_uid doesn't own it.
         """
-        review_to_delete = await self.get_review(review_uid, session)
-        await session.delete(review_to_delete)
+        statement = (
+            delete(Review)
+            .where(Review.uid == review_uid)
+            .returning(Review.book_uid, Review.rating)
+        )
+        if owner_uid is not None:
+            statement = statement.where(Review.user_uid == owner_uid)
+        result = await session.exec(statement)
+        deleted = result.first()
+        if deleted is None:
+            await self._raise_not_found_or_not_owned(review_uid, session)
+
+        if deleted.book_uid is not None:
+            await book_service.apply_rating_change(
+                deleted.book_uid, session, removed=deleted.rating
+            )
         await session.commit()
-        return review_to_delete
+        await invalidate_book(deleted.book_uid)
+
+    async def _raise_not_found_or_not_owned(
+        self, review_uid: str, session: AsyncSession
+    ):
+        """
+        Explains why a conditional write to a review matched no row; only runs
+        when the write failed, so successful writes stay a single statement.
+        """
+        result = await session.exec(select(Review.uid).where(Review.uid == review_uid))
+        if result.first() is None:
+            raise ReviewNotFoundException(f"Review with id {review_uid} was not found.")
+        raise ReviewNotOwnedException()
+
+    async def warm_up(self, session: AsyncSession) -> None:
+        """
+        Runs the statements of the hot review routes, reading no more than the
+        first page, so that they are compiled and prepared before the first request.
+        """
+        await self.get_all_reviews(session)
+        await self.get_user_reviews(WARM_UP_UID, session)
+        with suppress(ReviewNotFoundException):
+            await self.get_review(WARM_UP_UID, session)
@@ -1,14 +1,26 @@
-from typing import List
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.db.instrumentation import query_budget
 from src.db.main import get_session
-from src.endpoints.auth.dependencies import AccessTokenBearer, RoleChecker
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorException
+from src.endpoints.auth.dependencies import (
+    AccessTokenBearer,
+    RoleChecker,
+    get_owner_scope,
+)
 from src.endpoints.auth.utils import UserRoles
-from src.endpoints.books.dependencies import owns_book_or_admin
-from src.endpoints.tags.service import TagException, TagNotFoundException, TagService
+from src.endpoints.tags.service import (
+    TagAlreadyExistsException,
+    TagException,
+    TagNotFoundException,
+    TagService,
+    tag_projection,
+)
 from src.schemas.books_schemas import Book
+from src.schemas.pagination_schemas import Page
 from src.schemas.tags_schemas import Tag, TagAdd, TagCreate, TagUpdate
 
 tag_router = APIRouter()
@@ -17,30 +29,44 @@ access_token_bearer = AccessTokenBearer()
 admin_role_checker = RoleChecker(allowed_roles=[UserRoles.ADMIN.value])
 
 
-@tag_router.get("/", response_model=List[Tag])
+@tag_router.get("/", response_model=Page[Tag], dependencies=[Depends(query_budget(1))])
 async def get_all_tags(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     session: AsyncSession = Depends(get_session),
     token_details=Depends(access_token_bearer),
 ):
-    return await tag_service.get_all_tags(session)
+    try:
+        tags = await tag_service.get_all_tags(session, cursor, limit)
+        return Response(
+            content=tag_projection.dump_page(tags),
+            media_type="application/json",
+        )
+    except InvalidCursorException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        )
 
 
 @tag_router.post(
-    "/book/{book_uid}",
+    "/book/{book_id}",
     status_code=status.HTTP_201_CREATED,
     response_model=Book,
+    dependencies=[Depends(query_budget(3))],
 )
 async def add_tags_for_book(
     book_id: str,
     tag_data: TagAdd,
     session: AsyncSession = Depends(get_session),
-    _=Depends(owns_book_or_admin),
+    owner_uid: Optional[str] = Depends(get_owner_scope),
 ):
     try:
         return await tag_service.add_tags_for_book(
             book_uid=book_id,
-            review_data=tag_data,
+            tag_data=tag_data,
             session=session,
+            owner_uid=owner_uid,
         )
     except TagException as exc:
         raise HTTPException(
@@ -55,7 +81,13 @@ async def create_tag(
     session: AsyncSession = Depends(get_session),
     token_details=Depends(access_token_bearer),
 ) -> dict:
-    return await tag_service.create_tag(tag_data, session)
+    try:
+        return await tag_service.create_tag(tag_data, session)
+    except TagAlreadyExistsException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(exc),
+        )
 
 
 @tag_router.patch("/{tag_id}", response_model=Tag)
@@ -72,6 +104,11 @@ async def update_tag(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(exc),
         )
+    except TagAlreadyExistsException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(exc),
+        )
 
 
 @tag_router.delete("/{tag_id}", status_code=status.HTTP_204_NO_CONTENT)
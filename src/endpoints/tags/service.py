@@ -1,12 +1,37 @@
-from sqlmodel import desc, select
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import any_, literal
+from sqlalchemy.dialects.postgresql import array, insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import delete, func, select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.db.models import Tag
+from src.db.models import Book, BookTagLink, Tag
+from src.db.pagination import DEFAULT_PAGE_SIZE, paginate
+from src.db.projections import Projection
 from src.endpoints.books.service import BookException, BookService
+from src.redis.redis_cache import invalidate_book, invalidate_books
+from src.schemas import tags_schemas
 from src.schemas.tags_schemas import TagAdd, TagCreate, TagUpdate
 
 book_service = BookService()
 
+# the columns of the Tag schema; listings select these instead of whole tags
+tag_projection = Projection(
+    tags_schemas.Tag, columns=(Tag.uid, Tag.name, Tag.created_at)
+)
+
+# the books linked to the tag a statement writes; their cached responses embed
+# its name. Evaluated before the statement's cascades, so deletes see the links.
+tagged_book_uids = (
+    select(func.array_agg(BookTagLink.book_id))
+    .where(BookTagLink.tag_id == Tag.uid)
+    .scalar_subquery()
+    .label("book_uids")
+)
+
 
 class TagException(Exception):
     """Base class for TagService exceptions"""
@@ -26,11 +51,18 @@ class TagAlreadyExistsException(TagException):
 
 
 class TagService:
-    async def get_all_tags(self, session: AsyncSession):
-        statement = select(Tag).order_by(desc(Tag.created_at))
-        result = await session.exec(statement)
-        tags = result.all()
-        return tags
+    async def get_all_tags(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ):
+        """
+        Gets a page of tags as rows of tag_projection, newest first.
+        Raises InvalidCursorException if the cursor is invalid.
+        """
+        statement = select(*tag_projection.columns)
+        return await paginate(statement, Tag, session, cursor, limit)
 
     async def get_tag(self, tag_uid: str, session: AsyncSession):
         """
@@ -48,36 +80,46 @@ class TagService:
         book_uid: str,
         tag_data: TagAdd,
         session: AsyncSession,
+        owner_uid: Optional[str] = None,
     ):
         """
-        Adds tags for a book. Raises TagException if not successful.
+        Adds tags for a book, of owner_uid if given, creating the ones that don't
+        exist yet; tags the book already has are kept.
+        Raises TagException if not successful.
         """
         try:
             book = await book_service.get_book(book_uid, session)
-            book_tag_names = [t.name for t in book.tags]
         except BookException as exc:
             raise TagException(str(exc))
-
-        tags_to_add = []
-
-        for tag in tag_data.tags:
-            if tag.name in book_tag_names:
-                continue
-
-            result = await session.exec(select(Tag).where(Tag.name == tag.name))
-
-            tag_to_add = result.one_or_none()
-            if not tag_to_add:
-                tag_to_add = Tag(name=tag.name)
-                # session.add(tag)
-
-            tags_to_add.append(tag_to_add)
-
-        book.tags = tags_to_add
-
-        session.add(book)
+        if owner_uid is not None and str(book.user_uid) != str(owner_uid):
+            raise TagException("You are not allowed to perform this action")
+
+        tag_names = list(dict.fromkeys(tag.name for tag in tag_data.tags))
+        if not tag_names:
+            return book
+
+        now = datetime.now()
+        create_missing_tags = (
+            insert(Tag)
+            .values(
+                [{"uid": uuid.uuid4(), "name": n, "created_at": now} for n in tag_names]
+            )
+            .on_conflict_do_nothing(index_elements=[Tag.name])
+        )
+        link_tags = (
+            insert(BookTagLink)
+            .from_select(
+                ["book_id", "tag_id"],
+                select(literal(book.uid, Book.uid.type), Tag.uid).where(
+                    Tag.name == any_(array(tag_names))
+                ),
+            )
+            .on_conflict_do_nothing()
+        )
+        await session.exec(create_missing_tags)
+        await session.exec(link_tags)
         await session.commit()
-        # await session.refresh(book)
+        await invalidate_book(book_uid)
         return book
 
     async def create_tag(self, tag_data: TagCreate, session: AsyncSession):
@@ -93,31 +135,59 @@ class TagService:
         new_tag = Tag(name=tag_data.name)
 
         session.add(new_tag)
-        await session.commit()
+        try:
+            await session.commit()
+        except IntegrityError as exc:  # created concurrently
+            await session.rollback()
+            raise TagAlreadyExistsException() from exc
         return new_tag
 
     async def update_tag(
         self, tag_uid: str, update_data: TagUpdate, session: AsyncSession
-    ):
+    ) -> dict:
         """
-        Finds a tag by tag_uid and updates it.
-        Raises TagNotFoundException if no tag is found.
+        Updates a tag in a single statement and returns it shaped like the Tag
+        schema. Raises TagNotFoundException if no tag is found and
+        TagAlreadyExistsException if the new name is taken.
         """
-        tag_to_update = await self.get_tag(tag_uid, session)
-
-        update_data_dict = update_data.model_dump()
-        for k, v in update_data_dict.items():
-            setattr(tag_to_update, k, v)
+        statement = (
+            update(Tag)
+            .where(Tag.uid == tag_uid)
+            .values(update_data.model_dump())
+            .returning(*tag_projection.columns, tagged_book_uids)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await session.exec(statement)
+            updated = result.first()
+        except IntegrityError as exc:
+            await session.rollback()
+            raise TagAlreadyExistsException() from exc
+        if updated is None:
+            raise TagNotFoundException(f"Tag with id {tag_uid} was not found.")
 
         await session.commit()
-        return tag_to_update
+        await invalidate_books(updated.book_uids or [])
+        return tag_projection.to_dict(updated)
 
     async def delete_tag(self, tag_uid: str, session: AsyncSession):
         """
-        Finds a tag by tag_uid and deletes it.
+        Deletes a tag and its links to books in a single statement.
         Raises TagNotFoundException if no tag is found.
         """
-        tag_to_delete = await self.get_tag(tag_uid, session)
-        await session.delete(tag_to_delete)
+        statement = (
+            delete(Tag).where(Tag.uid == tag_uid).returning(Tag.uid, tagged_book_uids)
+        )
+        result = await session.exec(statement)
+        deleted = result.first()
+        if deleted is None:
+            raise TagNotFoundException(f"Tag with id {tag_uid} was not found.")
         await session.commit()
-        return tag_to_delete
+        await invalidate_books(deleted.book_uids or [])
+
+    async def warm_up(self, session: AsyncSession) -> None:
+        """
+        Runs the statement of the tag listing, reading no more than the first
+        page, so that it is compiled and prepared before the first request.
+        """
+        await self.get_all_tags(session)
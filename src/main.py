@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+from src.db.main import engine, warm_up_db
+from src.endpoints.auth.routes import auth_router
+from src.endpoints.auth.service import UserService
+from src.endpoints.auth.utils import (
+    shutdown_password_hashing,
+    warm_up_password_hashing,
+)
+from src.endpoints.books.routes import book_router
+from src.endpoints.books.service import BookService
+from src.endpoints.metrics.routes import prometheus_router, release_worker_metrics
+from src.endpoints.reviews.routes import review_router
+from src.endpoints.reviews.service import ReviewService
+from src.endpoints.tags.routes import tag_router
+from src.endpoints.tags.service import TagService
+from src.middleware.main import register_middleware
+from src.redis.main import redis_client, warm_up_redis
+from src.redis.redis_jti import start_revocation_listener, stop_revocation_listener
+
+logger = logging.getLogger("uvicorn.error")
+
+
+@asynccontextmanager
+async def life_span(app: FastAPI):
+    # the server accepts requests on this worker only once startup is done, so
+    # the first ones don't pay for connecting, compiling and loading
+    start_time = time.perf_counter()
+    await asyncio.gather(
+        warm_up_db(
+            (
+                UserService().warm_up,
+                BookService().warm_up,
+                ReviewService().warm_up,
+                TagService().warm_up,
+            )
+        ),
+        warm_up_redis(),
+        warm_up_password_hashing(),
+    )
+    start_revocation_listener()
+    logger.info("Warmed up in %.3f seconds.", time.perf_counter() - start_time)
+
+    yield
+
+    await stop_revocation_listener()
+    await redis_client.aclose()
+    await engine.dispose()
+    shutdown_password_hashing()
+    release_worker_metrics()
+
+
+VERSION = "v1"
+
+app = FastAPI(
+    title="Bookly",
+    description="A REST API for a book review web service.",
+    version=VERSION,
+    default_response_class=ORJSONResponse,
+    lifespan=life_span,
+)
+
+register_middleware(app)
+
+app.include_router(auth_router, prefix=f"/api/{VERSION}/auth", tags=["auth"])
+app.include_router(book_router, prefix=f"/api/{VERSION}/books", tags=["books"])
+app.include_router(review_router, prefix=f"/api/{VERSION}/reviews", tags=["reviews"])
+app.include_router(tag_router, prefix=f"/api/{VERSION}/tags", tags=["tags"])
+app.include_router(prometheus_router)
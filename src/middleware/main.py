@@ -1,23 +1,71 @@
+import time
 import uuid
-import logging
+
 from fastapi import FastAPI
 from fastapi.requests import Request
-import time
+from prometheus_client import Gauge, Histogram
+
+from src.db.instrumentation import QueryStats, check_query_stats, current_query_stats
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent, by route template.",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being processed.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Statements executed on the database per request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing statements on the database per request.",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+def route_template(request: Request) -> str:
+    # label with the template, not the path, to keep the number of series bounded
+    route = request.scope.get("route")
+    return route.path if route is not None else "unmatched"
 
-logger = logging.getLogger("uvicorn.errors")
 
 def register_middleware(app: FastAPI):
 
-    @app.middleware('http')
+    @app.middleware("http")
     async def request_meta(request: Request, call_next):
         # assign an id to the request
         request_id = str(uuid.uuid4())
         request.state.request_id = request_id
 
-        # process the request and measure its time
-        start_time = time.time()
-        response = await call_next(request)
-        processing_time = time.time() - start_time
+        # process the request and measure its time and its database work
+        method = request.method
+        query_stats = QueryStats(request_id)
+        token = current_query_stats.set(query_stats)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start_time = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            check_query_stats(query_stats, route_template(request))
+            status = response.status_code
+            return response
+        finally:
+            processing_time = time.perf_counter() - start_time
+            in_progress.dec()
+            current_query_stats.reset(token)
 
-        logger.info(f'Request {request_id} completed in {processing_time} seconds.')
-        return response
+            route = route_template(request)
+            REQUEST_DURATION.labels(method, route, status).observe(processing_time)
+            REQUEST_DB_QUERIES.labels(method, route).observe(query_stats.queries)
+            REQUEST_DB_DURATION.labels(method, route).observe(query_stats.duration)
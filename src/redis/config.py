@@ -5,6 +5,9 @@ from pydantic_settings import BaseSettings
 class _Settings(BaseSettings):
     redis_host: str = "redis"
     redis_port: str = Field(..., alias="REDIS_PORT")
+    redis_cache_ttl: int = Field(5 * 60, alias="REDIS_CACHE_TTL")  # seconds
+    # connections opened at startup
+    redis_warm_connections: int = Field(4, alias="REDIS_WARM_CONNECTIONS")
 
 
 settings = _Settings()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from src.redis.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Time spent on one redis command, including waiting for a connection.",
+    ["command"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+REDIS_COMMAND_ERRORS = Counter(
+    "redis_command_errors",
+    "Redis commands that failed.",
+    ["command"],
+)
+REDIS_POOL_CONNECTIONS = Gauge(
+    "redis_pool_connections",
+    "Connections of the redis pool, by state.",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    Redis client that times every command and records the state of its pool.
+    Commands queued on a pipeline are not timed one by one.
+    """
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        start_time = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except RedisError:
+            REDIS_COMMAND_ERRORS.labels(command).inc()
+            raise
+        finally:
+            REDIS_COMMAND_DURATION.labels(command).observe(
+                time.perf_counter() - start_time
+            )
+            self._record_pool_stats()
+
+    def _record_pool_stats(self) -> None:
+        # redis-py has no public accessors for these
+        pool = self.connection_pool
+        REDIS_POOL_CONNECTIONS.labels("in_use").set(len(pool._in_use_connections))
+        REDIS_POOL_CONNECTIONS.labels("idle").set(len(pool._available_connections))
+
+
+redis_client = InstrumentedRedis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    decode_responses=True,
+    db=0,
+)
+
+
+async def warm_up_redis(connections: int = settings.redis_warm_connections) -> None:
+    """
+    Opens connections to redis at once, so that the first requests don't pay for
+    connecting. Failures are logged; the client reconnects on demand.
+    """
+    results = await asyncio.gather(
+        *(redis_client.ping() for _ in range(connections)), return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, RedisError)]
+    if errors:
+        logger.error(
+            "Could not warm up %d of %d redis connections.",
+            len(errors),
+            connections,
+            exc_info=errors[0],
+        )
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from prometheus_client import Counter
+
+from redis.exceptions import RedisError, WatchError
+from src.redis.config import settings
+from src.redis.main import redis_client
+
+logger = logging.getLogger(__name__)
+
+LOCK_EXPIRY = 5  # seconds; upper bound for rebuilding one cache entry
+LOCK_POLL_INTERVAL = 0.05  # seconds
+LOCK_POLL_ATTEMPTS = 20
+
+# bumped by every book write; book list keys embed it, and book detail entries
+# are only stored if it didn't change while they were loaded
+BOOK_LIST_VERSION_KEY = "cache:books:version"
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups",
+    "Lookups of the response cache, by result.",
+    ["result"],
+)
+CACHE_HITS = CACHE_LOOKUPS.labels("hit")
+CACHE_MISSES = CACHE_LOOKUPS.labels("miss")
+CACHE_ERRORS = Counter(
+    "cache_errors",
+    "Response cache operations that failed because redis was unavailable.",
+)
+
+# in-process single-flight: concurrent misses for the same key on this worker
+# all await the same load instead of each querying the database
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def book_key(book_uid: str) -> str:
+    return f"cache:book:{book_uid}"
+
+
+def user_key(user_uid: str) -> str:
+    return f"cache:user:{user_uid}"
+
+
+async def book_list_key(*parts) -> str:
+    """
+    Builds the key of a book list response. Keys embed the current list version,
+    so bumping the version invalidates every cached list at once.
+    """
+    try:
+        version = await redis_client.get(BOOK_LIST_VERSION_KEY) or "0"
+    except RedisError:
+        CACHE_ERRORS.inc()
+        version = "unavailable"
+    return ":".join(["cache:books", version, *(str(p) for p in parts)])
+
+
+async def get_or_set(
+    key: str,
+    loader: Callable[[], Awaitable[Union[str, bytes]]],
+    ttl: int = settings.redis_cache_ttl,
+    version_key: Optional[str] = None,
+) -> Union[str, bytes]:
+    """
+    Returns the cached value of key, or calls loader, caches and returns its result.
+    Concurrent misses are collapsed to one load per worker, and a short redis lock
+    makes other workers wait for that load instead of stampeding the database.
+    With version_key, the result isn't cached if the value of version_key
+    changed while loader ran, since it may predate the write that changed it.
+    Falls back to loader if redis is unavailable.
+    """
+    cached = await _get(key)
+    if cached is not None:
+        CACHE_HITS.inc()
+        return cached
+    CACHE_MISSES.inc()
+
+    while (inflight := _inflight.get(key)) is not None:
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            if not inflight.cancelled() or asyncio.current_task().cancelling():
+                raise
+            # the request loading the value was cancelled, e.g. its client
+            # disconnected; take the load over instead of failing this request
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = await _load_single_flight(key, loader, ttl, version_key)
+        future.set_result(value)
+        return value
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # mark as retrieved when nobody else is waiting
+        raise
+    finally:
+        if not future.done():
+            future.cancel()
+        del _inflight[key]
+
+
+async def invalidate_book(book_uid: Optional[str]) -> None:
+    """
+    Drops the cached detail response of a book and every cached book list.
+    """
+    await invalidate_books([] if book_uid is None else [book_uid])
+
+
+async def invalidate_books(book_uids: Iterable[str]) -> None:
+    """
+    Drops the cached detail responses of books and every cached book list.
+    """
+    keys = [book_key(str(book_uid)) for book_uid in book_uids]
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            # the version goes first: a detail entry loaded before the write is
+            # then either refused by _set_if_unchanged or deleted right after
+            pipe.incr(BOOK_LIST_VERSION_KEY)
+            if keys:
+                pipe.delete(*keys)
+            await pipe.execute()
+    except RedisError:
+        CACHE_ERRORS.inc()
+        logger.exception("Could not invalidate the cache of books %s.", keys)
+
+
+async def invalidate_user(user_uid: str) -> None:
+    """
+    Drops the cached identity of an user. Call it after every write to an user.
+    """
+    try:
+        await redis_client.delete(user_key(str(user_uid)))
+    except RedisError:
+        CACHE_ERRORS.inc()
+        logger.exception("Could not invalidate the cache of user %s.", user_uid)
+
+
+async def _load_single_flight(
+    key: str,
+    loader: Callable[[], Awaitable[Union[str, bytes]]],
+    ttl: int,
+    version_key: Optional[str] = None,
+) -> Union[str, bytes]:
+    lock_key = f"{key}:lock"
+    try:
+        locked = await redis_client.set(lock_key, "", nx=True, ex=LOCK_EXPIRY)
+    except RedisError:
+        CACHE_ERRORS.inc()
+        return await loader()
+
+    if not locked:
+        # another worker is rebuilding this entry; wait for it, then load anyway
+        for _ in range(LOCK_POLL_ATTEMPTS):
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            cached = await _get(key)
+            if cached is not None:
+                return cached
+        return await loader()
+
+    try:
+        version = None
+        if version_key is not None:
+            version = await _get(version_key) or "0"
+        value = await loader()
+        try:
+            if version_key is None:
+                await redis_client.set(key, value, ex=ttl)
+            else:
+                await _set_if_unchanged(key, value, ttl, version_key, version)
+        except RedisError:
+            CACHE_ERRORS.inc()
+        return value
+    finally:
+        try:
+            await redis_client.delete(lock_key)
+        except RedisError:
+            CACHE_ERRORS.inc()
+
+
+async def _set_if_unchanged(
+    key: str,
+    value: Union[str, bytes],
+    ttl: int,
+    version_key: str,
+    version: str,
+) -> None:
+    """
+    Sets key only if version_key still holds version, atomically.
+    """
+    async with redis_client.pipeline(transaction=True) as pipe:
+        await pipe.watch(version_key)
+        if (await pipe.get(version_key) or "0") != version:
+            return
+        pipe.multi()
+        pipe.set(key, value, ex=ttl)
+        with suppress(WatchError):  # changed since; the entry would be stale
+            await pipe.execute()
+
+
+async def _get(key: str) -> Optional[str]:
+    try:
+        return await redis_client.get(key)
+    except RedisError:
+        CACHE_ERRORS.inc()
+        return None
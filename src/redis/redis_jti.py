@@ -1,25 +1,111 @@
-import redis.asyncio as redis
-from src.redis.config import settings
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Optional
+
+from redis.exceptions import RedisError
+from src.lru import ExpiringLRU
+from src.redis.main import redis_client
 
 JTI_EXPIRY = 60 * 60  # 1 hour; corresponds to ACCESS_TOKEN_EXPIRY from auth utils
 
+REVOKED_CACHE_SIZE = 10_000
+NOT_REVOKED_CACHE_SIZE = 100_000
+NOT_REVOKED_CACHE_TTL = 5  # seconds; upper bound for a missed revocation message
+REVOCATION_CHANNEL = "jti:revoked"
+LISTENER_RETRY_DELAY = 1  # seconds
+
+logger = logging.getLogger(__name__)
 
-token_blocklist = redis.Redis(
-    host=settings.redis_host,
-    port=settings.redis_port,
-    decode_responses=True,
-    db=0,
-)
+
+# jtis known to be revoked, and jtis recently confirmed not to be; both are kept
+# coherent across workers through the revocation channel
+_revoked = ExpiringLRU(REVOKED_CACHE_SIZE)
+_not_revoked = ExpiringLRU(NOT_REVOKED_CACHE_SIZE)
+_listener: Optional[asyncio.Task] = None
 
 
 async def add_jti_to_blocklist(jti: str) -> None:
-    await token_blocklist.set(
+    await redis_client.set(
         name=jti,
         value="",
         ex=JTI_EXPIRY,
     )
+    _mark_revoked(jti)
+    await redis_client.publish(REVOCATION_CHANNEL, jti)
+
+
+async def token_in_blocklist(jti: str, exp: Optional[float] = None) -> bool:
+    """
+    Checks whether a token was revoked. Answers from the in-process caches when
+    possible; a negative answer is cached for at most NOT_REVOKED_CACHE_TTL
+    seconds and never past the token's exp.
+    """
+    _ensure_listener()
+
+    if jti in _revoked:
+        return True
+    if jti in _not_revoked:
+        return False
+
+    revoked = await redis_client.get(jti) is not None
+    if revoked:
+        _mark_revoked(jti)
+    else:
+        expires_at = time.time() + NOT_REVOKED_CACHE_TTL
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        _not_revoked.add(jti, expires_at)
+    return revoked
+
+
+def start_revocation_listener() -> None:
+    """
+    Starts applying revocations published by other workers. token_in_blocklist
+    starts it too, if it isn't running.
+    """
+    _ensure_listener()
+
+
+async def stop_revocation_listener() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.cancel()
+    with suppress(asyncio.CancelledError):
+        await _listener
+    _listener = None
+
+
+def _mark_revoked(jti: str) -> None:
+    _not_revoked.discard(jti)
+    _revoked.add(jti, time.time() + JTI_EXPIRY)
+
+
+def _ensure_listener() -> None:
+    global _listener
+    if (
+        _listener is None
+        or _listener.done()
+        or _listener.get_loop() is not asyncio.get_running_loop()
+    ):
+        _listener = asyncio.create_task(_listen_for_revocations())
 
 
-async def token_in_blocklist(jti: str) -> bool:
-    jti = await token_blocklist.get(jti)
-    return jti is not None
+async def _listen_for_revocations() -> None:
+    """
+    Applies revocations published by other workers to the in-process caches.
+    """
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                # messages published while we were not subscribed are lost
+                _not_revoked.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        _mark_revoked(message["data"])
+        except RedisError:
+            logger.exception("Lost the subscription to revoked token ids.")
+            await asyncio.sleep(LISTENER_RETRY_DELAY)
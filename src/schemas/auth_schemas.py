@@ -16,6 +16,13 @@ class User(BaseModel):
     updated_at: datetime
 
 
+class UserPrincipal(BaseModel):
+    uid: uuid.UUID
+    username: str
+    email: str
+    role: str
+
+
 class UserCreate(BaseModel):
     username: str = Field(max_length=16)
     email: str = Field(max_length=32)
@@ -1,5 +1,7 @@
 import uuid
 from datetime import date, datetime
+from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -12,6 +14,9 @@ class Book(BaseModel):
     published_date: date
     page_count: int
     language: str
+    rating_count: int
+    rating_average: Optional[float]
+    rating_histogram: List[int]  # number of reviews for every rating from 1 to 5
     created_at: datetime
     updated_at: datetime
 
@@ -31,3 +36,41 @@ class BookUpdate(BaseModel):
     publisher: str
     page_count: int
     language: str
+
+
+class BookImportError(BaseModel):
+    line: int
+    error: str
+
+
+class BookImportSummary(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BookImportError]
+
+
+class BookSort(str, Enum):
+    """
+    Sort orders of book listings; a leading "-" sorts descending.
+    """
+
+    NEWEST = "-created_at"
+    OLDEST = "created_at"
+    PUBLISHED_DATE = "published_date"
+    PUBLISHED_DATE_DESC = "-published_date"
+    TITLE = "title"
+    TITLE_DESC = "-title"
+    PAGE_COUNT = "page_count"
+    PAGE_COUNT_DESC = "-page_count"
+
+
+class BookFilters(BaseModel):
+    author: Optional[str] = None
+    language: Optional[str] = None
+    publisher: Optional[str] = None
+    published_from: Optional[date] = None
+    published_to: Optional[date] = None
+    min_page_count: Optional[int] = None
+    max_page_count: Optional[int] = None
+    tag: Optional[str] = None
+    min_rating: Optional[float] = None
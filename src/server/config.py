@@ -0,0 +1,32 @@
+import os
+from typing import Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on every platform
+        return os.cpu_count() or 1
+
+
+class _Settings(BaseSettings):
+    server_host: str = Field("0.0.0.0", alias="SERVER_HOST")
+    server_port: int = Field(8000, alias="SERVER_PORT")
+    workers: int = Field(default_factory=_available_cpus, alias="WEB_CONCURRENCY")
+    backlog: int = Field(2048, alias="SERVER_BACKLOG")
+    # keep it above the idle timeout of the load balancer in front of the app
+    keep_alive: int = Field(5, alias="SERVER_KEEP_ALIVE")  # seconds
+    # per worker; further connections are answered with 503
+    limit_concurrency: Optional[int] = Field(None, alias="SERVER_LIMIT_CONCURRENCY")
+    # time in-flight requests get to finish after SIGTERM
+    graceful_shutdown_timeout: int = Field(
+        20, alias="SERVER_GRACEFUL_SHUTDOWN_TIMEOUT"
+    )  # seconds
+    access_log: bool = Field(False, alias="SERVER_ACCESS_LOG")
+    forwarded_allow_ips: str = Field("127.0.0.1", alias="FORWARDED_ALLOW_IPS")
+
+
+settings = _Settings()
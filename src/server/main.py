@@ -0,0 +1,71 @@
+"""
+Runs the API with the production server settings: several worker processes,
+uvloop, httptools and a graceful shutdown. Configured through the environment,
+see src/server/config.py; DB_MAX_CONNECTIONS caps the connections of all
+workers together.
+
+Usage: python -m src.server.main
+"""
+
+import glob
+import os
+import tempfile
+
+import uvicorn
+
+from src.db.config import settings as db_settings
+from src.server.config import settings
+
+
+def _prepare_metrics_dir(workers: int) -> None:
+    """
+    Points the workers at a directory without samples for their Prometheus
+    metrics; a temporary one if PROMETHEUS_MULTIPROC_DIR isn't set and there
+    are several workers. Samples left over from an earlier run would be added
+    to the new ones, so they are deleted; nothing else in the directory is.
+    """
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir is None:
+        if workers > 1:
+            metrics_dir = tempfile.mkdtemp(prefix="bookly-metrics-")
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+        return
+
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def main():
+    workers = max(settings.workers, 1)
+    # the workers size their connection pools by it, see DB_MAX_CONNECTIONS
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    pool_size, max_overflow = db_settings.model_copy(
+        update={"web_concurrency": workers}
+    ).db_pool_limits
+    print(
+        f"Starting {workers} worker(s), each with a pool of {pool_size} database "
+        f"connection(s) and up to {max_overflow} more."
+    )
+    _prepare_metrics_dir(workers)
+
+    uvicorn.run(
+        "src:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.keep_alive,
+        limit_concurrency=settings.limit_concurrency,
+        timeout_graceful_shutdown=settings.graceful_shutdown_timeout,
+        access_log=settings.access_log,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.forwarded_allow_ips,
+        server_header=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+from src.db.models import Book
+from src.db.pagination import InvalidCursorException, decode_cursor, encode_cursor
+
+
+def raw_cursor(payload) -> str:
+    raw = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_round_trip():
+    uid = uuid.uuid4()
+    created_at = datetime(2020, 1, 1, 12, 30)
+    cursor = encode_cursor("created_at", created_at, uid)
+    assert decode_cursor(cursor, Book.created_at) == (created_at, uid)
+
+    cursor = encode_cursor("page_count", 300, uid)
+    assert decode_cursor(cursor, Book.page_count) == (300, uid)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor!",
+        raw_cursor(b"\xff\xfe"),
+        raw_cursor(b"{not json"),
+        raw_cursor("created_at"),
+        raw_cursor({"sort": "created_at"}),
+        raw_cursor(["created_at", "2020-01-01T00:00:00"]),
+        raw_cursor(["created_at", "2020-01-01T00:00:00", str(uuid.uuid4()), 1]),
+        # a uid or sort key of another type
+        raw_cursor(["created_at", "2020-01-01T00:00:00", 5]),
+        raw_cursor(["created_at", "2020-01-01T00:00:00", [1, 2]]),
+        raw_cursor(["created_at", "2020-01-01T00:00:00", None]),
+        raw_cursor([["created_at"], "2020-01-01T00:00:00", str(uuid.uuid4())]),
+        raw_cursor(["created_at", "2020-01-01T00:00:00", "not-a-uuid"]),
+        # a value of another type
+        raw_cursor(["created_at", 5, str(uuid.uuid4())]),
+        raw_cursor(["created_at", "yesterday", str(uuid.uuid4())]),
+        raw_cursor(["created_at", None, str(uuid.uuid4())]),
+        # another sort order
+        raw_cursor(["-created_at", "2020-01-01T00:00:00", str(uuid.uuid4())]),
+        raw_cursor(["title", "2020-01-01T00:00:00", str(uuid.uuid4())]),
+    ],
+)
+def test_rejects_malformed_cursors(cursor):
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor, Book.created_at)
+
+
+@pytest.mark.parametrize("value", [True, "300", 3.5, None])
+def test_rejects_other_types_for_int_sort_keys(value):
+    cursor = raw_cursor(["page_count", value, str(uuid.uuid4())])
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor, Book.page_count)